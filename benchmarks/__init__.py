@@ -0,0 +1,3 @@
+"""
+Benchmarks for Sortify (synthetic mailboxes, rule engine)
+"""
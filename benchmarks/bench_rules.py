@@ -0,0 +1,180 @@
+"""
+Rule engine benchmarks
+Measures apply_rules throughput and peak memory over synthetic mailboxes of
+growing size and rule sets of growing size, plus extract_email_from_sender and
+rule loading, and compares the results with stored baselines.
+
+    python -m benchmarks.bench_rules                        # default sizes, compare with baselines
+    python -m benchmarks.bench_rules --sizes 1000,1000000 --rules 5,500
+    python -m benchmarks.bench_rules --update-baseline      # record this machine's numbers
+
+Baselines are machine specific: record them on the machine that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from business import rules_engine
+from business.rule_dsl import RuleSet
+from business.rules_engine import apply_rules, extract_email_from_sender
+from utils import normalize_sender
+from .mailbox_generator import generate_emails, generate_rules, make_senders, rules_to_ini
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_RULE_COUNTS = (5, 50, 500)
+
+
+def _best_of(repeat: int, func: Callable[[], None]) -> float:
+    """Fastest of `repeat` timed runs in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_apply_rules(emails: List, rule_count: int, senders: List[str], repeat: int) -> Dict:
+    """apply_rules over the mailbox with the legacy rules plus rule_count generated rules"""
+    saved = rules_engine.COMPILED_RULES, rules_engine.PARALLEL_THRESHOLD
+    generated = generate_rules(rule_count, senders)
+    rules_engine.COMPILED_RULES = RuleSet(list(saved[0].rules) + generated)
+    rules_engine.PARALLEL_THRESHOLD = 0  # serial: measure the matcher, not the pool
+    try:
+        def run():
+            for email in emails:
+                email.tag = "----"
+            apply_rules(emails)
+
+        seconds = _best_of(repeat, run)
+
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        rules_engine.COMPILED_RULES, rules_engine.PARALLEL_THRESHOLD = saved
+
+    return {
+        "emails_per_s": round(len(emails) / seconds),
+        "us_per_email": round(seconds / len(emails) * 1e6, 3),
+        "peak_kb": round(peak / 1024),
+    }
+
+
+def bench_extract_sender(emails: List, repeat: int) -> Dict:
+    """extract_email_from_sender over every sender header, starting each run from a cold parse cache"""
+    raw = [e.sender for e in emails]
+
+    def run():
+        # Otherwise every run after the first only measures lru_cache hits
+        normalize_sender.cache_clear()
+        for sender in raw:
+            extract_email_from_sender(sender)
+
+    seconds = _best_of(repeat, run)
+    return {"ops_per_s": round(len(raw) / seconds)}
+
+
+def bench_load_rules(rule_count: int, senders: List[str], repeat: int) -> Dict:
+    """load_rules_from_ini on an INI holding rule_count generated rules"""
+    with tempfile.TemporaryDirectory() as tmp:
+        ini_path = os.path.join(tmp, "settings.ini")
+        with open(ini_path, "w", encoding="utf-8") as f:
+            f.write(rules_to_ini(generate_rules(rule_count, senders)))
+        try:
+            seconds = _best_of(repeat, lambda: rules_engine.load_rules_from_ini(ini_path))
+        finally:
+            rules_engine.load_rules_from_ini()
+    return {"ms": round(seconds * 1000, 3)}
+
+
+def run_benchmarks(sizes, rule_counts, sender_count: int, exponent: float, repeat: int) -> Dict[str, Dict]:
+    """Run every benchmark; keys name the benchmark and its parameters"""
+    senders = make_senders(sender_count)
+    results: Dict[str, Dict] = {}
+
+    for size in sizes:
+        emails = list(generate_emails(size, senders, exponent=exponent))
+        for rule_count in rule_counts:
+            key = f"apply_rules[n={size},rules={rule_count}]"
+            results[key] = bench_apply_rules(emails, rule_count, senders, repeat)
+            print(f"{key:45s} {results[key]}")
+        key = f"extract_email_from_sender[n={size}]"
+        results[key] = bench_extract_sender(emails, repeat)
+        print(f"{key:45s} {results[key]}")
+        del emails
+
+    for rule_count in rule_counts:
+        key = f"load_rules[rules={rule_count}]"
+        results[key] = bench_load_rules(rule_count, senders, repeat)
+        print(f"{key:45s} {results[key]}")
+    return results
+
+
+def compare(results: Dict[str, Dict], baselines: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Regressions against the baselines (throughput down or time / memory up by more than tolerance)"""
+    regressions = []
+    for key, metrics in results.items():
+        base = baselines.get(key)
+        if not base:
+            continue
+        for metric, value in metrics.items():
+            reference = base.get(metric)
+            if not reference:
+                continue
+            higher_is_better = metric.endswith("_per_s")
+            change = (value - reference) / reference
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{key} {metric}: {reference} -> {value} ({change:+.0%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rule engine benchmarks")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="mailbox sizes, comma separated (default: %(default)s)")
+    parser.add_argument("--rules", default=",".join(map(str, DEFAULT_RULE_COUNTS)),
+                        help="generated rule counts, comma separated (default: %(default)s)")
+    parser.add_argument("--senders", type=int, default=2000, help="distinct senders (default: %(default)s)")
+    parser.add_argument("--zipf", type=float, default=1.1, help="sender Zipf exponent (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs, best is kept (default: %(default)s)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative regression (default: %(default)s)")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as baselines")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    rule_counts = [int(r) for r in args.rules.split(",") if r]
+    results = run_benchmarks(sizes, rule_counts, args.senders, args.zipf, args.repeat)
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    if args.update_baseline:
+        baselines.update(results)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baselines written to {BASELINE_PATH}")
+        return 0
+
+    regressions = compare(results, baselines, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print("No regressions against baselines")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
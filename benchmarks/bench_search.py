@@ -0,0 +1,103 @@
+"""
+Search index benchmarks
+Indexes a synthetic mailbox into a temporary FTS5 database and times searches for
+a common word (hits a large part of the mailbox), a rare word and a prefix,
+then compares the results with the stored baselines (shared with bench_rules).
+
+    python -m benchmarks.bench_search                       # default sizes, compare with baselines
+    python -m benchmarks.bench_search --sizes 100000
+    python -m benchmarks.bench_search --update-baseline     # record this machine's numbers
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from services.search_index import SearchIndex
+from .bench_rules import BASELINE_PATH, _best_of, compare
+from .mailbox_generator import generate_emails, make_senders
+
+DEFAULT_SIZES = (10_000, 100_000)
+
+# 'vizsga' is one of the generated subject / body words (most emails contain it)
+QUERIES = {
+    "common": "vizsga",
+    "rare": "kovacs.anna0",
+    "prefix": "beadan",
+}
+
+
+def bench_search(emails: List, repeat: int) -> Dict[str, Dict]:
+    """Index the emails once, then time every query of QUERIES"""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SearchIndex(os.path.join(tmp, "search.db"))
+        try:
+            start = time.perf_counter()
+            index.index_emails(emails)
+            results["index"] = {"emails_per_s": round(len(emails) / (time.perf_counter() - start))}
+
+            for name, text in QUERIES.items():
+                seconds = _best_of(repeat, lambda: index.search(text))
+                results[name] = {"ms": round(seconds * 1000, 3)}
+        finally:
+            index.close()
+    return results
+
+
+def run_benchmarks(sizes, sender_count: int, exponent: float, repeat: int) -> Dict[str, Dict]:
+    """Run every benchmark; keys name the benchmark and its parameters"""
+    senders = make_senders(sender_count)
+    results: Dict[str, Dict] = {}
+    for size in sizes:
+        emails = list(generate_emails(size, senders, exponent=exponent))
+        for name, metrics in bench_search(emails, repeat).items():
+            key = f"search[{name},n={size}]"
+            results[key] = metrics
+            print(f"{key:45s} {metrics}")
+        del emails
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Search index benchmarks")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="mailbox sizes, comma separated (default: %(default)s)")
+    parser.add_argument("--senders", type=int, default=2000, help="distinct senders (default: %(default)s)")
+    parser.add_argument("--zipf", type=float, default=1.1, help="sender Zipf exponent (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs, best is kept (default: %(default)s)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative regression (default: %(default)s)")
+    parser.add_argument("--update-baseline", action="store_true", help="store the results as baselines")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = run_benchmarks(sizes, args.senders, args.zipf, args.repeat)
+
+    baselines = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            baselines = json.load(f)
+
+    if args.update_baseline:
+        baselines.update(results)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baselines written to {BASELINE_PATH}")
+        return 0
+
+    regressions = compare(results, baselines, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print("No regressions against baselines")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
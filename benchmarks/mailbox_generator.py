@@ -0,0 +1,145 @@
+"""
+Synthetic mailbox generator for benchmarks.
+Senders follow a Zipf-like distribution (a few senders write most of the mail,
+as in a real inbox), domains come from a weighted mix, and rule sets of any size
+are generated against the same sender population.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from business.rule_dsl import Rule
+from models.email_model import EmailRecord
+from utils import apply_sender_info
+
+# Weighted sender domain mix of a university inbox
+DEFAULT_DOMAIN_MIX = {
+    "uni-milton.hu": 45,
+    "gmail.com": 20,
+    "freemail.hu": 8,
+    "citromail.hu": 4,
+    "neptun.uni-milton.hu": 8,
+    "moodle.uni-milton.hu": 7,
+    "milt-on.hu": 3,
+    "newsletter.example.com": 5,
+}
+
+SUBJECT_WORDS = (
+    "vizsga", "beadandó", "határidő", "órarend", "értekezlet", "jegy", "konzultáció",
+    "szakdolgozat", "pótlás", "hírlevél", "meghívó", "tájékoztató", "kérdés", "zh",
+    "labor", "félév", "kurzus", "Neptun", "Moodle", "értesítés",
+)
+BODY_WORDS = SUBJECT_WORDS + (
+    "kérem", "köszönöm", "üdvözlettel", "tisztelt", "hallgató", "oktató", "csatolva",
+    "melléklet", "időpont", "terem", "link", "feltöltés", "javítás", "eredmény",
+)
+ATTACHMENTS = (("", ""), ("jegyzet.pdf", "application/pdf"), ("feladat.docx",
+               "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+               ("kep.png", "image/png"))
+FIRST_NAMES = ("anna", "bence", "csaba", "dora", "eszter", "gabor", "istvan", "judit", "peter", "zsolt")
+LAST_NAMES = ("kovacs", "nagy", "toth", "szabo", "horvath", "varga", "kiss", "molnar", "nemeth", "farkas")
+
+
+def make_senders(count: int, domain_mix: Optional[Dict[str, int]] = None, seed: int = 1) -> List[str]:
+    """Distinct sender addresses spread over the domain mix"""
+    rng = random.Random(seed)
+    mix = domain_mix or DEFAULT_DOMAIN_MIX
+    domains, weights = list(mix), list(mix.values())
+    senders = []
+    for i in range(count):
+        local = f"{rng.choice(LAST_NAMES)}.{rng.choice(FIRST_NAMES)}{i}"
+        senders.append(f"{local}@{rng.choices(domains, weights)[0]}")
+    return senders
+
+
+def zipf_weights(count: int, exponent: float = 1.1) -> List[float]:
+    """Weight of the k-th most frequent sender ~ 1 / k^exponent"""
+    return [1.0 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def generate_emails(n: int, senders: Sequence[str], exponent: float = 1.1, body_words: int = 40,
+                    seed: int = 1) -> Iterator[EmailRecord]:
+    """Yield n synthetic emails (records without body files, body kept inline)
+
+    Args:
+        n: Number of emails
+        senders: Sender population (see make_senders)
+        exponent: Zipf exponent of the sender distribution (0 = uniform)
+        body_words: Words per body
+        seed: Random seed (same seed = same mailbox)
+    """
+    rng = random.Random(seed)
+    cum_weights = []
+    total = 0.0
+    for weight in zipf_weights(len(senders), exponent):
+        total += weight
+        cum_weights.append(total)
+
+    start = datetime(2024, 1, 1)
+    for i in range(n):
+        address = rng.choices(senders, cum_weights=cum_weights)[0]
+        local = address.split("@", 1)[0]
+        attachment, mime = rng.choice(ATTACHMENTS)
+        record = EmailRecord(
+            message_id=f"bench{i:08d}",
+            sender=f"{local.replace('.', ' ').title()} <{address}>",
+            subject=" ".join(rng.choices(SUBJECT_WORDS, k=4)),
+            datetime=(start + timedelta(minutes=7 * i)).strftime("%Y.%m.%d %H:%M"),
+            attachment_count=1 if attachment else 0,
+            attachment_names=(attachment,) if attachment else (),
+            mime_types=("text/plain", mime) if mime else ("text/plain",),
+            body_text=" ".join(rng.choices(BODY_WORDS, k=body_words)),
+        )
+        apply_sender_info(record)  # as fetch_new_emails does at ingest
+        yield record
+
+
+def generate_rules(count: int, senders: Sequence[str], seed: int = 1) -> List[Rule]:
+    """Rule set of the given size against a sender population
+
+    Mix: 60% address rules, 20% domain rules, 10% subject regex rules,
+    10% body keyword rules (the last two restricted to a domain half of the time).
+    """
+    rng = random.Random(seed)
+    domains = sorted({s.split("@", 1)[1] for s in senders})
+    rules = []
+    for i in range(count):
+        kind = rng.random()
+        name, tag, priority = f"bench{i}", f"tag{i % 12}", 10 + i
+        if kind < 0.6:
+            addresses = frozenset(rng.sample(list(senders), min(len(senders), rng.randint(1, 20))))
+            rules.append(Rule(name, tag, priority, addresses=addresses))
+        elif kind < 0.8:
+            domain = rng.choice(domains)
+            pattern = domain if rng.random() < 0.5 else domain.split(".")[0]
+            rules.append(Rule(name, tag, priority, domains=frozenset({pattern})))
+        else:
+            sender_domains = frozenset({rng.choice(domains)}) if rng.random() < 0.5 else frozenset()
+            if kind < 0.9:
+                words = rng.sample(SUBJECT_WORDS, 2)
+                rules.append(Rule(name, tag, priority, domains=sender_domains,
+                                  subject=rf"\b({'|'.join(words)})\b"))
+            else:
+                rules.append(Rule(name, tag, priority, domains=sender_domains,
+                                  body_keywords=tuple(w.lower() for w in rng.sample(BODY_WORDS, 3))))
+    return rules
+
+
+def rules_to_ini(rules: Sequence[Rule]) -> str:
+    """The rules as '[rule.<name>]' INI sections (for measuring rule loading)"""
+    lines = []
+    for rule in rules:
+        lines.append(f"[rule.{rule.name}]")
+        lines.append(f"tag = {rule.tag}")
+        lines.append(f"priority = {rule.priority}")
+        if rule.addresses:
+            lines.append(f"senders = {', '.join(sorted(rule.addresses))}")
+        if rule.domains:
+            lines.append(f"domains = {', '.join(sorted(rule.domains))}")
+        if rule.subject:
+            lines.append(f"subject = {rule.subject}")
+        if rule.body_keywords:
+            lines.append(f"body = {', '.join(rule.body_keywords)}")
+        lines.append("")
+    return "\n".join(lines)
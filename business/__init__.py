@@ -1,6 +1,7 @@
 """
 Business logic layer for Sortify
 """
-from .rules_engine import apply_rules
+from .rules_engine import apply_rules, rules_signature
+from .rules_service import RulesService, rules_service
 
-__all__ = ['apply_rules']
+__all__ = ['apply_rules', 'rules_signature', 'RulesService', 'rules_service']
@@ -0,0 +1,102 @@
+"""
+Process-pool rule evaluation for large batches (backfills).
+Emails are projected to the fields rules read, sharded into chunks and evaluated
+in worker processes that compile their own copy of the rule set; results come
+back in input order, so the outcome is identical to serial evaluation.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.email_model import EmailRecord
+from utils import email_body_text
+from .rule_dsl import Rule, RuleSet
+
+# Fields the predicates of rule_dsl read (the body is added only where a rule may need it)
+RULE_FIELDS = ("subject", "attachment_names", "mime_types", "gmail_labels")
+
+# Bodies read per bulk load (bounds the texts one load holds besides the payload)
+TEXT_CHUNK = 1024
+
+# Per-process rule set, built by the pool initializer
+_worker_rules: Optional[RuleSet] = None
+
+
+def _init_worker(rules: Tuple[Rule, ...]) -> None:
+    global _worker_rules
+    _worker_rules = RuleSet(rules)
+
+
+def _evaluate_chunk(chunk: List[Tuple[Dict, str, str]]) -> List[int]:
+    """Index of the winning rule (in _worker_rules.rules) per item, -1 for no match"""
+    rules = _worker_rules
+    index = {id(rule): pos for pos, rule in enumerate(rules.rules)}
+    results = []
+    for fields, sender_email, sender_domain in chunk:
+        rule = rules.evaluate(fields, sender_email, sender_domain)
+        results.append(-1 if rule is None else index[id(rule)])
+    return results
+
+
+def _project(email: Dict) -> Dict:
+    return {name: email.get(name) for name in RULE_FIELDS}
+
+
+def _body_texts(emails: List[Dict]) -> List[str]:
+    """Plain-text bodies in input order
+
+    Records with a body on disk are read chunk-wise through EmailRecord.texts_loader
+    (StorageService.load_texts - parallel I/O, past the body cache).
+    """
+    loader = EmailRecord.texts_loader
+    if loader is None:
+        return [email_body_text(email) for email in emails]
+
+    texts = []
+    for start in range(0, len(emails), TEXT_CHUNK):
+        chunk = emails[start:start + TEXT_CHUNK]
+        stored = [i for i, email in enumerate(chunk)
+                  if isinstance(email, EmailRecord) and (email.text_file or email.body_file)]
+        loaded = dict(zip(stored, loader([chunk[i] for i in stored])))
+        texts.extend(loaded[i] if i in loaded else email_body_text(email) for i, email in enumerate(chunk))
+    return texts
+
+
+def evaluate_parallel(rule_set: RuleSet, items: Sequence[Tuple[Dict, str, str]],
+                      workers: Optional[int] = None) -> List[Optional[Rule]]:
+    """Evaluate a rule set over many emails in a process pool
+
+    Args:
+        rule_set: Compiled rule set (its rules are shipped and recompiled per worker)
+        items: (email, lowercased sender address, lowercased sender domain) tuples
+        workers: Worker processes (default: CPU count)
+
+    Returns:
+        Matching rule (or None) per item, in input order
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or len(items) < 2:
+        # Nothing to parallelize - a pool would only add start-up and pickling cost
+        return [rule_set.evaluate(email, sender_email, sender_domain)
+                for email, sender_email, sender_domain in items]
+
+    payload = [(_project(email), sender_email, sender_domain) for email, sender_email, sender_domain in items]
+
+    # Bodies are read here (I/O), in bulk, and only for emails whose sender, labels and
+    # attachments leave a body rule reachable
+    if any(rule.body_keywords for rule in rule_set.rules):
+        pending = [i for i, (email, sender_email, sender_domain) in enumerate(items)
+                   if rule_set.reads_body(email, sender_email, sender_domain)]
+        for i, text in zip(pending, _body_texts([items[i][0] for i in pending])):
+            payload[i][0]["body_text"] = text
+
+    # A few chunks per worker keeps them busy without paying per-email IPC
+    chunk_size = max(1, -(-len(payload) // (workers * 4)))
+    chunks = [payload[i:i + chunk_size] for i in range(0, len(payload), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(rule_set.rules,)) as pool:
+        indexes = [i for result in pool.map(_evaluate_chunk, chunks) for i in result]
+
+    return [None if i < 0 else rule_set.rules[i] for i in indexes]
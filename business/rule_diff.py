@@ -0,0 +1,44 @@
+"""
+Difference of two compiled rule sets.
+An email's outcome can only change if one of the added, removed or modified rules
+matches it (before or after the change), so after a reload only the senders /
+domains those rules name have to be re-evaluated.
+"""
+
+from typing import FrozenSet, Tuple
+
+from .rule_dsl import Rule, RuleSet
+from .rule_matcher import RuleMatcher
+
+
+class RuleSetDiff:
+    """Rules that differ between two rule sets and the senders they can affect"""
+
+    def __init__(self, old: RuleSet, new: RuleSet):
+        old_rules, new_rules = set(old.rules), set(new.rules)
+        # A modified rule shows up twice: old version in one set, new version in the other
+        self.changed: Tuple[Rule, ...] = tuple(
+            sorted(old_rules ^ new_rules, key=lambda r: (r.priority, r.name)))
+        self.addresses: FrozenSet[str] = frozenset(
+            a for rule in self.changed for a in rule.addresses)
+        self._domains = RuleMatcher(r for r in self.changed if r.domains)
+
+    def __bool__(self) -> bool:
+        return bool(self.changed)
+
+    @property
+    def unbounded(self) -> bool:
+        """True if a changed rule has no sender condition (any email may be affected)"""
+        return any(not rule.has_sender for rule in self.changed)
+
+    def matches_domain(self, domain: str) -> bool:
+        """True if a changed rule's domain pattern matches the sender domain"""
+        return bool(domain) and bool(self._domains.matching("", domain))
+
+    def describe(self) -> str:
+        return ", ".join(rule.name for rule in self.changed) or "-"
+
+
+def diff_rule_sets(old: RuleSet, new: RuleSet) -> RuleSetDiff:
+    """Diff of two compiled rule sets"""
+    return RuleSetDiff(old, new)
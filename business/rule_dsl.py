@@ -0,0 +1,324 @@
+"""
+Declarative categorization rules.
+Rules are '[rule.<name>]' sections in config/settings.ini:
+
+    [rule.vizsga]
+    tag = egyeb
+    priority = 50
+    senders = neptun@uni-milton.hu
+    domains = neptun, uni-milton.hu
+    subject = (vizsga|zh)\\b
+    body = beadandó, határidő
+    attachments = pdf, application/pdf
+    labels = Important
+
+Every listed predicate must hold; inside a predicate any listed value is enough.
+A RuleSet compiles the rules into an evaluation plan: sender conditions of all
+rules are answered by one RuleMatcher lookup (memoized per sender), then per rule
+the remaining predicates run cheapest first, so the body is only read for a rule
+whose other predicates already matched. Subject regexes and body keywords of all
+rules are batched into one TextMatcher per field.
+"""
+
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from utils import email_body_text
+from .rule_matcher import RuleMatcher, SenderRule
+from .text_matcher import TextMatcher
+
+RULE_SECTION_PREFIX = "rule."
+DEFAULT_PRIORITY = 100
+
+
+@dataclass(frozen=True)
+class Rule(SenderRule):
+    """Declarative rule; empty predicates are not checked"""
+
+    subject: str = ""                                         # regex, case-insensitive
+    body_keywords: Tuple[str, ...] = ()                       # lowercased substrings
+    attachments: FrozenSet[str] = field(default_factory=frozenset)  # extensions / mime types
+    labels: FrozenSet[str] = field(default_factory=frozenset)       # lowercased Gmail label names
+
+    @property
+    def has_sender(self) -> bool:
+        return bool(self.addresses or self.domains)
+
+    @property
+    def sender_only(self) -> bool:
+        """True if the outcome depends on the sender alone"""
+        return not (self.subject or self.body_keywords or self.attachments or self.labels)
+
+
+def _split(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def parse_rule_section(name: str, options: Dict[str, str]) -> Rule:
+    """Build a Rule from the options of a '[rule.<name>]' section
+
+    Raises:
+        ValueError: Missing tag, bad priority or invalid subject regex
+    """
+    tag = options.get("tag", "").strip().lower()
+    if not tag:
+        raise ValueError("missing 'tag'")
+    subject = options.get("subject", "").strip()
+    if subject:
+        try:
+            re.compile(subject)
+        except re.error as ex:
+            raise ValueError(f"invalid subject regex: {ex}") from None
+
+    rule = Rule(
+        name=name,
+        tag=tag,
+        priority=int(options.get("priority", DEFAULT_PRIORITY)),
+        addresses=frozenset(a.lower() for a in _split(options.get("senders", ""))),
+        domains=frozenset(d.lower() for d in _split(options.get("domains", ""))),
+        subject=subject,
+        body_keywords=tuple(k.lower() for k in _split(options.get("body", ""))),
+        attachments=frozenset(a.lower().lstrip(".") for a in _split(options.get("attachments", ""))),
+        labels=frozenset(label.lower() for label in _split(options.get("labels", ""))),
+    )
+    if not rule.has_sender and rule.sender_only:
+        raise ValueError("no predicates")
+    return rule
+
+
+def parse_rule_sections(config) -> List[Rule]:
+    """All valid '[rule.<name>]' sections of a ConfigParser (invalid ones are reported and skipped)"""
+    rules = []
+    for section in config.sections():
+        if not section.startswith(RULE_SECTION_PREFIX):
+            continue
+        name = section[len(RULE_SECTION_PREFIX):]
+        try:
+            rules.append(parse_rule_section(name, dict(config.items(section))))
+        except ValueError as ex:
+            print(f"[RULES] Skipping [{section}]: {ex}")
+    return rules
+
+
+class _EmailView:
+    """Lazily derived fields of one email (each computed at most once)"""
+
+    def __init__(self, email: Dict, scan: '_ContentScan'):
+        self.email = email
+        self.scan = scan
+
+    @cached_property
+    def subject(self) -> str:
+        return self.email.get("subject", "") or ""
+
+    @cached_property
+    def body(self) -> str:
+        return email_body_text(self.email).lower()
+
+    @cached_property
+    def subject_misses(self) -> FrozenSet[int]:
+        """Ranks of the subject rules whose regex does not match (one scan for all rules)"""
+        return self.scan.subject_ranks - self.scan.subjects.matches(self.subject)
+
+    @cached_property
+    def body_misses(self) -> FrozenSet[int]:
+        """Ranks of the body rules with none of their keywords in the body (one scan for all rules)"""
+        return self.scan.body_ranks - self.scan.bodies.matches(self.body)
+
+    @cached_property
+    def attachment_keys(self) -> FrozenSet[str]:
+        keys = set()
+        for name in _as_list(self.email.get("attachment_names")):
+            if "." in name:
+                keys.add(name.rsplit(".", 1)[1].lower())
+        keys.update(m.lower() for m in _as_list(self.email.get("mime_types")))
+        return frozenset(keys)
+
+    @cached_property
+    def labels(self) -> FrozenSet[str]:
+        return frozenset(label.lower() for label in (self.email.get("gmail_labels") or ()))
+
+
+def _as_list(value) -> Iterable[str]:
+    """List fields are tuples on records and '|'-joined strings on fresh Gmail dicts"""
+    if not value:
+        return ()
+    if isinstance(value, str):
+        return [v for v in value.split("|") if v]
+    return value
+
+
+class _ContentScan:
+    """Subject regexes and body keywords of a group of rules, one TextMatcher per field"""
+
+    def __init__(self, ranked: Iterable[Tuple[int, Rule]]):
+        ranked = list(ranked)
+        self.subjects = TextMatcher(regexes=((rule.subject, rank) for rank, rule in ranked))
+        self.subject_ranks = frozenset(rank for rank, rule in ranked if rule.subject)
+        self.bodies = TextMatcher(literals=((k, rank) for rank, rule in ranked for k in rule.body_keywords))
+        self.body_ranks = frozenset(rank for rank, rule in ranked if rule.body_keywords)
+
+
+class RuleSet:
+    """Compiled evaluation plan of a list of rules
+
+    The sender part of the plan is memoized per (address, domain): the first
+    sender-only rule a sender matches decides its outcome, so per email only
+    the content rules (subject / body / attachments / labels) ranked before it
+    still run. The memo belongs to this instance - a reloaded rule set is a new
+    RuleSet, which drops every memoized outcome at once.
+
+    Subject regexes and body keywords of the rules a sender can reach are
+    compiled into one TextMatcher per field (shared by senders that reach the
+    same rules): the first rule that needs a field scans it for all of them,
+    later rules only look their rank up in the result.
+    """
+
+    SENDER_MEMO_SIZE = 65536
+
+    def __init__(self, rules: Iterable[Rule]):
+        """Compile rules
+
+        Args:
+            rules: Rules; lower priority first, for equal priorities the earlier rule wins
+        """
+        self.rules: Tuple[Rule, ...] = tuple(sorted(rules, key=lambda r: r.priority))
+        self.tags: FrozenSet[str] = frozenset(r.tag for r in self.rules)
+        self._senders = RuleMatcher(r for r in self.rules if r.has_sender)
+        sender_rank = {id(rule): rank for rank, rule in enumerate(self._senders.rules)}
+        # A rule without any predicate (rejected by parse_rule_section) never matches
+        self._plan = [(rule, rank, sender_rank.get(id(rule)), self._checks(rule))
+                      for rank, rule in enumerate(self.rules) if rule.has_sender or not rule.sender_only]
+        self._by_sender: Dict[Tuple[str, str], Tuple] = {}
+        self._scans: Dict[FrozenSet[int], _ContentScan] = {}
+        self.memo_hits = 0
+        self.memo_misses = 0
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    @staticmethod
+    def _checks(rule: Rule) -> Tuple:
+        """Label / attachment predicates of a rule, cheapest first
+
+        Sender conditions are resolved per sender, subject and body ones by the
+        per-email scans.
+        """
+        checks = []
+        if rule.labels:
+            checks.append(lambda view: not rule.labels.isdisjoint(view.labels))
+        if rule.attachments:
+            checks.append(lambda view: not rule.attachments.isdisjoint(view.attachment_keys))
+        return tuple(checks)
+
+    def _sender_plan(self, sender_email: str, sender_domain: str) -> Tuple:
+        """Rules a sender can still reach, ending at its first sender-only match
+
+        Returns:
+            ((rule, rank, checks, needs body) entries, _ContentScan of their subject / body rules)
+        """
+        key = (sender_email, sender_domain)
+        plan = self._by_sender.get(key)
+        if plan is not None:
+            self.memo_hits += 1
+            return plan
+
+        self.memo_misses += 1
+        hits = self._senders.matching(sender_email, sender_domain)
+        reachable = []
+        for rule, rank, sender_rank, checks in self._plan:
+            if sender_rank is not None and sender_rank not in hits:
+                continue
+            reachable.append((rule, rank, checks, bool(rule.body_keywords)))
+            if rule.sender_only:
+                break  # always matches - nothing after it can win
+
+        content = frozenset(rank for rule, rank, _, _ in reachable if rule.subject or rule.body_keywords)
+        scan = self._scans.get(content)
+        if scan is None:
+            scan = self._scans[content] = _ContentScan((rank, self.rules[rank]) for rank in sorted(content))
+        plan = (tuple(reachable), scan)
+
+        if len(self._by_sender) >= self.SENDER_MEMO_SIZE:
+            self._by_sender, self._scans = {}, {}
+        self._by_sender[key] = plan
+        return plan
+
+    def memo_info(self) -> Dict[str, int]:
+        """Size and hit / miss counts of the sender memo"""
+        return {"senders": len(self._by_sender), "hits": self.memo_hits, "misses": self.memo_misses}
+
+    def evaluate(self, email: Dict, sender_email: str, sender_domain: str = "") -> Optional[Rule]:
+        """Highest-priority rule matching the email, or None
+
+        Args:
+            email: Email dict / record
+            sender_email: Lowercased sender address
+            sender_domain: Lowercased sender domain
+        """
+        plan, scan = self._sender_plan(sender_email, sender_domain)
+        if not plan:
+            return None
+        if plan[0][0].sender_only:
+            return plan[0][0]  # decided by the sender alone
+
+        view = _EmailView(email, scan)
+        misses = view.subject_misses if scan.subject_ranks else frozenset()
+        body_scanned = False
+        for rule, rank, checks, needs_body in plan:
+            if rank in misses:
+                continue
+            if checks and not all(check(view) for check in checks):
+                continue
+            if needs_body:
+                if not body_scanned:
+                    # The body is only read once a body rule is the best remaining candidate
+                    body_scanned = True
+                    misses = misses | view.body_misses
+                if rank in misses:
+                    continue
+            return rule
+        return None
+
+    def reads_body(self, email: Dict, sender_email: str, sender_domain: str = "") -> bool:
+        """True if evaluate() may read the body of the email
+
+        Decided from the memoized sender plan and the label / attachment checks
+        alone (no text is scanned); subject rules are assumed not to match.
+        """
+        plan, scan = self._sender_plan(sender_email, sender_domain)
+        if not scan.body_ranks:
+            return False
+        view = _EmailView(email, scan)
+        for rule, rank, checks, needs_body in plan:
+            if checks and not all(check(view) for check in checks):
+                continue
+            if needs_body:
+                return True
+            if not rule.subject:
+                return False  # matches whatever the subject and body are
+        return False
+
+    def evaluate_profiled(self, email: Dict, sender_email: str, sender_domain: str,
+                          rule_seconds: Counter, rule_checks: Counter) -> Optional[Rule]:
+        """evaluate() that also adds the time spent on each rule to rule_seconds
+
+        A field scan is charged to the first rule that needs the field.
+        """
+        clock = time.perf_counter
+        plan, scan = self._sender_plan(sender_email, sender_domain)
+        view = _EmailView(email, scan)
+        for rule, rank, checks, needs_body in plan:
+            start = clock()
+            matched = (not (rule.subject and rank in view.subject_misses)
+                       and all(check(view) for check in checks)
+                       and not (needs_body and rank in view.body_misses))
+            rule_seconds[rule.name] += clock() - start
+            rule_checks[rule.name] += 1
+            if matched:
+                return rule
+        return None
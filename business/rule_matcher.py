@@ -0,0 +1,163 @@
+"""
+Compiled sender matcher for the rule engine.
+The rule set is compiled once into an exact-address hash, a reversed-label trie
+for dotted domain patterns and an Aho-Corasick automaton for dotless (substring)
+domain patterns, so matching an email costs the same however many addresses and
+domains are configured.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+@dataclass(frozen=True)
+class SenderRule:
+    """One sender-based rule (lower priority value = evaluated first)"""
+
+    name: str
+    tag: str
+    priority: int
+    addresses: FrozenSet[str] = field(default_factory=frozenset)
+    domains: FrozenSet[str] = field(default_factory=frozenset)
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher (one scan per text, whatever the pattern count)"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, object]] = ()):
+        """Build the automaton
+
+        Args:
+            patterns: (literal, payload) pairs; a literal may carry several payloads
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple] = [()]
+        for literal, payload in patterns:
+            self.add(literal, payload)
+        self._build()
+
+    def __bool__(self) -> bool:
+        return len(self._goto) > 1
+
+    def add(self, literal: str, payload) -> None:
+        if not literal:
+            return
+        node = 0
+        for char in literal:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        self._out[node] += (payload,)
+
+    def _build(self) -> None:
+        # Breadth-first: fail links point to the longest proper suffix in the trie,
+        # outputs are merged along them so a scan never follows fail chains for output
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] += self._out[self._fail[child]]
+
+    def iter_matches(self, text: str):
+        """Yield the payload of every pattern occurring in text (with repeats)"""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                yield from out[node]
+
+    def matches(self, text: str) -> Set:
+        """Set of payloads whose pattern occurs in text"""
+        return set(self.iter_matches(text))
+
+
+class DomainTrie:
+    """Reversed-label trie: 'uni-milton.hu' matches the domain itself and its subdomains"""
+
+    def __init__(self):
+        self._root: Dict = {}
+
+    def add(self, domain: str, payload) -> None:
+        node = self._root
+        for label in reversed(domain.strip(".").split(".")):
+            node = node.setdefault(label, {})
+        node.setdefault(None, []).append(payload)
+
+    def matches(self, domain: str) -> List:
+        """Payloads of every pattern that is a label-aligned suffix of domain"""
+        found = []
+        node = self._root
+        for label in reversed(domain.split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            found.extend(node.get(None, ()))
+        return found
+
+
+class RuleMatcher:
+    """Compiled sender rule set returning the highest-priority match in one pass"""
+
+    def __init__(self, rules: Iterable[SenderRule]):
+        """Compile rules
+
+        Args:
+            rules: Sender rules; for equal priorities the earlier rule wins
+        """
+        self.rules: Tuple[SenderRule, ...] = tuple(
+            sorted(rules, key=lambda r: r.priority))  # stable: ties keep input order
+
+        # Rules are referred to by their rank (index in priority order) - min() picks the winner
+        self._addresses: Dict[str, List[int]] = {}
+        self._trie = DomainTrie()
+        substrings = []
+        for rank, rule in enumerate(self.rules):
+            for address in rule.addresses:
+                self._addresses.setdefault(address.lower(), []).append(rank)
+            for domain in rule.domains:
+                domain = domain.lower()
+                if "." in domain:
+                    self._trie.add(domain, rank)
+                else:
+                    substrings.append((domain, rank))
+        self._substrings = AhoCorasick(substrings)
+
+    def match(self, sender_email: str, sender_domain: str = "") -> Optional[SenderRule]:
+        """Highest-priority rule matching the sender, or None
+
+        Args:
+            sender_email: Lowercased sender address
+            sender_domain: Lowercased sender domain (derived from the address if empty)
+        """
+        best = min(self._ranks(sender_email, sender_domain), default=None)
+        return None if best is None else self.rules[best]
+
+    def matching(self, sender_email: str, sender_domain: str = "") -> Set[int]:
+        """Ranks (indices into self.rules) of every rule whose sender condition matches"""
+        return set(self._ranks(sender_email, sender_domain))
+
+    def _ranks(self, sender_email: str, sender_domain: str):
+        if not sender_domain and "@" in sender_email:
+            sender_domain = sender_email.rpartition("@")[2]
+
+        yield from self._addresses.get(sender_email, ())
+        if sender_domain:
+            yield from self._trie.matches(sender_domain)
+            if self._substrings:
+                yield from self._substrings.iter_matches(sender_domain)
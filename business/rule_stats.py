@@ -0,0 +1,65 @@
+"""
+Rule evaluation statistics.
+apply_rules reports once per batch (hits per rule, no-match count, elapsed time);
+with profiling on, the time spent in each rule's predicates is collected as well.
+"""
+
+import threading
+from collections import Counter
+from typing import Dict
+
+
+class RuleStats:
+    """Thread-safe counters of rule hits and evaluation cost"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.hits: Counter = Counter()            # rule name -> matched emails
+            self.rule_seconds: Counter = Counter()    # rule name -> predicate time (profiling)
+            self.rule_checks: Counter = Counter()     # rule name -> evaluations (profiling)
+            self.evaluated = 0
+            self.skipped = 0
+            self.no_match = 0
+            self.batches = 0
+            self.seconds = 0.0
+            self.last_batch_seconds = 0.0
+            self.max_batch_seconds = 0.0
+
+    def record_batch(self, hits: Counter, evaluated: int, skipped: int, no_match: int,
+                     seconds: float, rule_seconds: Counter = None, rule_checks: Counter = None) -> None:
+        """Add the result of one apply_rules call"""
+        with self._lock:
+            self.hits.update(hits)
+            if rule_seconds:
+                self.rule_seconds.update(rule_seconds)
+            if rule_checks:
+                self.rule_checks.update(rule_checks)
+            self.evaluated += evaluated
+            self.skipped += skipped
+            self.no_match += no_match
+            self.batches += 1
+            self.seconds += seconds
+            self.last_batch_seconds = seconds
+            self.max_batch_seconds = max(self.max_batch_seconds, seconds)
+
+    def snapshot(self) -> Dict:
+        """Copy of the counters (safe to read while apply_rules runs)"""
+        with self._lock:
+            return {
+                "hits": dict(self.hits),
+                "rule_seconds": dict(self.rule_seconds),
+                "rule_checks": dict(self.rule_checks),
+                "evaluated": self.evaluated,
+                "skipped": self.skipped,
+                "no_match": self.no_match,
+                "no_match_rate": self.no_match / self.evaluated if self.evaluated else 0.0,
+                "batches": self.batches,
+                "seconds": self.seconds,
+                "last_batch_seconds": self.last_batch_seconds,
+                "max_batch_seconds": self.max_batch_seconds,
+                "emails_per_second": self.evaluated / self.seconds if self.seconds else 0.0,
+            }
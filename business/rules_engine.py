@@ -1,12 +1,20 @@
 """
 Email categorization rule engine.
-Applies rules based on sender address/domain to assign tags.
+Applies rules based on sender address/domain (legacy [rules.*] sections) and
+declarative [rule.<name>] rules (see rule_dsl) to assign tags.
 Rules are loaded from config/settings.ini with hardcoded fallback.
 """
 
+from collections import Counter
 from typing import List, Dict, Set
 import configparser
 import os
+import time
+
+from utils import normalize_sender
+from .rule_dsl import Rule, RuleSet, parse_rule_sections
+from .rule_stats import RuleStats
+from .parallel_rules import evaluate_parallel
 
 # -------- Hardcoded fallback configuration --------
 # Used if INI file is missing or corrupt
@@ -72,6 +80,24 @@ MOODLE_DOMAINS: Set[str] = set()
 MILTON_ADDRESSES: Set[str] = set()
 MILTON_DOMAINS: Set[str] = set()
 UNI_DOMAIN: str = ""
+CUSTOM_RULES: List[Rule] = []
+
+# Compiled plan over the sets above and CUSTOM_RULES (rebuilt whenever they are loaded)
+COMPILED_RULES: RuleSet = RuleSet(())
+
+# Hit counters / timing of apply_rules; PROFILE_RULES ([general] rule_profiling) adds per-rule timing
+RULE_STATS = RuleStats()
+PROFILE_RULES = False
+
+# Batches with at least this many emails to evaluate go to a process pool (0 = never)
+PARALLEL_THRESHOLD = 20000
+PARALLEL_WORKERS = 0  # 0 = CPU count
+
+# Tags that are never overwritten by rules (Gmail / manual)
+PROTECTED_TAGS = frozenset({"vezetoseg", "tanszek", "neptun", "moodle", "milt-on", "hianyos", "egyeb"})
+
+# (mtime_ns, size) of the INI the rules were loaded from - changes whenever the rules may have
+RULES_SIGNATURE = None
 
 
 def load_rules_from_ini(ini_path: str = "config/settings.ini") -> bool:
@@ -80,6 +106,9 @@ def load_rules_from_ini(ini_path: str = "config/settings.ini") -> bool:
     """
     global LEADERSHIP_EMAILS, DEPARTMENT_EMAILS, NEPTUN_ADDRESSES, NEPTUN_DOMAINS
     global MOODLE_ADDRESSES, MOODLE_DOMAINS, MILTON_ADDRESSES, MILTON_DOMAINS, UNI_DOMAIN
+    global CUSTOM_RULES, PROFILE_RULES, PARALLEL_THRESHOLD, PARALLEL_WORKERS, RULES_SIGNATURE
+
+    RULES_SIGNATURE = _file_signature(ini_path)
 
     if not os.path.exists(ini_path):
         print(f"[RULES] INI file not found: {ini_path}, using fallback")
@@ -149,11 +178,19 @@ def load_rules_from_ini(ini_path: str = "config/settings.ini") -> bool:
         else:
             UNI_DOMAIN = FALLBACK_UNI_DOMAIN
 
+        # Declarative rules
+        CUSTOM_RULES = parse_rule_sections(config)
+        PROFILE_RULES = config.getboolean('general', 'rule_profiling', fallback=False)
+        PARALLEL_THRESHOLD = config.getint('general', 'parallel_rules_threshold', fallback=20000)
+        PARALLEL_WORKERS = config.getint('general', 'rule_workers', fallback=0)
+
         print(f"[RULES] Loaded from INI: {len(LEADERSHIP_EMAILS)} leadership, "
               f"{len(DEPARTMENT_EMAILS)} department, "
               f"{len(NEPTUN_ADDRESSES)} neptun, "
               f"{len(MOODLE_ADDRESSES)} moodle, "
-              f"{len(MILTON_ADDRESSES)} milton")
+              f"{len(MILTON_ADDRESSES)} milton, "
+              f"{len(CUSTOM_RULES)} custom")
+        _compile_rules()
         return True
 
     except Exception as ex:
@@ -166,6 +203,7 @@ def _load_fallback():
     """Load hardcoded fallback rules"""
     global LEADERSHIP_EMAILS, DEPARTMENT_EMAILS, NEPTUN_ADDRESSES, NEPTUN_DOMAINS
     global MOODLE_ADDRESSES, MOODLE_DOMAINS, MILTON_ADDRESSES, MILTON_DOMAINS, UNI_DOMAIN
+    global CUSTOM_RULES
 
     LEADERSHIP_EMAILS = FALLBACK_LEADERSHIP_EMAILS.copy()
     DEPARTMENT_EMAILS = FALLBACK_DEPARTMENT_EMAILS.copy()
@@ -176,22 +214,57 @@ def _load_fallback():
     MILTON_ADDRESSES = FALLBACK_MILTON_ADDRESSES.copy()
     MILTON_DOMAINS = {'milt-on'}
     UNI_DOMAIN = FALLBACK_UNI_DOMAIN
+    CUSTOM_RULES = []
+    _compile_rules()
     print("[RULES] Using hardcoded fallback rules")
 
 
+def _compile_rules():
+    """Compile the legacy sets and the declarative rules into COMPILED_RULES (priority order)"""
+    global COMPILED_RULES
+
+    legacy = [
+        Rule("tanszek", "tanszek", 1, frozenset(DEPARTMENT_EMAILS)),
+        Rule("vezetoseg", "vezetoseg", 2, frozenset(LEADERSHIP_EMAILS)),
+        Rule("neptun", "neptun", 3, frozenset(NEPTUN_ADDRESSES), frozenset(NEPTUN_DOMAINS)),
+        Rule("moodle", "moodle", 4, frozenset(MOODLE_ADDRESSES), frozenset(MOODLE_DOMAINS)),
+        Rule("milt-on", "milt-on", 5, frozenset(MILTON_ADDRESSES), frozenset(MILTON_DOMAINS)),
+    ]
+    # An empty 'emails =' list means the legacy rule is switched off, not "match everyone"
+    COMPILED_RULES = RuleSet([rule for rule in legacy if rule.has_sender] + CUSTOM_RULES)
+
+
+def _file_signature(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def rules_signature():
+    """Signature of the loaded rule set (used to tell if stored rule results are current)"""
+    return ("ini", RULES_SIGNATURE)
+
+
 def extract_email_from_sender(sender: str) -> str:
     """
     Extract email address from 'Name <email@domain.com>' format.
-    Returns lowercase email.
+    Returns lowercase email (see utils.normalize_sender).
     """
-    if "<" in sender and ">" in sender:
-        start = sender.index("<") + 1
-        end = sender.index(">")
-        return sender[start:end].strip().lower()
-    return sender.strip().lower()
+    return normalize_sender(sender).address
+
+
+def _sender_of(email_item: Dict) -> tuple:
+    """(address, domain) precomputed at ingest; parsed only for records that lack them"""
+    address = email_item.get("sender_address")
+    if address:
+        return address, email_item.get("sender_domain", "")
+    info = normalize_sender(email_item.get("sender", ""))
+    return info.address, info.domain
 
 
-def apply_rules(emails: List[Dict]) -> List[Dict]:
+def apply_rules(emails: List[Dict], reevaluate: bool = False) -> List[Dict]:
     """
     Apply categorization rules to a list of emails.
     Updates 'tag' and 'rule_applied' fields in place.
@@ -203,53 +276,47 @@ def apply_rules(emails: List[Dict]) -> List[Dict]:
     3. neptun
     4. moodle
     5. milt-on
+       [rule.<name>] rules by their own priority (default 100, after the above)
     6. Student emails (non-university domain) - LAST priority before default
     7. Default (uncategorized - stays as ----)
 
     MERGED LOGIC:
     - Skips emails that already have valid tags (manual or Gmail-based)
     - Only applies rules to emails with tag == '----'
+    - reevaluate=True also re-evaluates emails whose tag came from a rule
+      (rule_applied set), e.g. after the rules changed
+    - Batches of PARALLEL_THRESHOLD or more emails are evaluated in a process pool
     """
 
+    rule_set = COMPILED_RULES
+    protected = PROTECTED_TAGS | rule_set.tags
+    hits, rule_seconds, rule_checks = Counter(), Counter(), Counter()
+    no_match = 0
+    started = time.perf_counter()
+
+    candidates = []
     for email_item in emails:
         current_tag = (email_item.get("tag") or "----").lower()
 
         # NE ÍRD FELÜL a már meglévő normál címkéket (Gmail/kézi)
-        if current_tag in ["vezetoseg", "tanszek", "neptun", "moodle", "milt-on", "hianyos", "egyeb"]:
-            continue
-
-        sender_raw = email_item.get("sender", "")
-        sender_email = extract_email_from_sender(sender_raw)
-        sender_domain = email_item.get("sender_domain", "").lower()
-
-        # Priority 1: Department (YOUR department first!)
-        if sender_email in DEPARTMENT_EMAILS:
-            email_item["tag"] = "tanszek"
-            email_item["rule_applied"] = "tanszek"
+        if current_tag in protected and not (reevaluate and email_item.get("rule_applied")):
             continue
 
-        # Priority 2: Leadership (other department heads)
-        if sender_email in LEADERSHIP_EMAILS:
-            email_item["tag"] = "vezetoseg"
-            email_item["rule_applied"] = "vezetoseg"
-            continue
-
-        # Priority 3: Neptun
-        if sender_email in NEPTUN_ADDRESSES or any(d in sender_domain for d in NEPTUN_DOMAINS):
-            email_item["tag"] = "neptun"
-            email_item["rule_applied"] = "neptun"
-            continue
-
-        # Priority 4: Moodle
-        if sender_email in MOODLE_ADDRESSES or any(d in sender_domain for d in MOODLE_DOMAINS):
-            email_item["tag"] = "moodle"
-            email_item["rule_applied"] = "moodle"
-            continue
-
-        # Priority 5: Milt-On
-        if sender_email in MILTON_ADDRESSES or any(d in sender_domain for d in MILTON_DOMAINS):
-            email_item["tag"] = "milt-on"
-            email_item["rule_applied"] = "milt-on"
+        candidates.append((email_item, *_sender_of(email_item)))
+
+    # Sender conditions in one lookup, then subject / attachment / label / body predicates
+    if PARALLEL_THRESHOLD and len(candidates) >= PARALLEL_THRESHOLD:
+        outcomes = evaluate_parallel(rule_set, candidates, PARALLEL_WORKERS)
+    elif PROFILE_RULES:
+        outcomes = [rule_set.evaluate_profiled(e, s, d, rule_seconds, rule_checks) for e, s, d in candidates]
+    else:
+        outcomes = [rule_set.evaluate(e, s, d) for e, s, d in candidates]
+
+    for (email_item, _, sender_domain), rule in zip(candidates, outcomes):
+        if rule is not None:
+            email_item["tag"] = rule.tag
+            email_item["rule_applied"] = rule.name
+            hits[rule.name] += 1
             continue
 
         # # Priority 6: Student emails (non-university domain) - MOVED TO END
@@ -261,20 +328,44 @@ def apply_rules(emails: List[Dict]) -> List[Dict]:
         # Default: Uncategorized/incomplete (keep as ----)
         email_item["tag"] = "----"
         email_item["rule_applied"] = ""
+        no_match += 1
 
+    if candidates:
+        RULE_STATS.record_batch(hits, len(candidates), len(emails) - len(candidates), no_match,
+                                time.perf_counter() - started, rule_seconds, rule_checks)
     return emails
 
 
 def get_rule_summary() -> Dict:
     """
     Return a summary of configured rules (for debugging/settings display).
+    'rules' lists every compiled rule with its hit count (0 = dead rule) and, if
+    profiling is on, its average predicate time; 'stats' holds the batch counters,
+    'sender_memo' the size and hit rate of the per-sender outcome memo.
     """
+    stats = RULE_STATS.snapshot()
+    rules = []
+    for rule in COMPILED_RULES.rules:
+        checks = stats["rule_checks"].get(rule.name, 0)
+        rules.append({
+            "name": rule.name,
+            "tag": rule.tag,
+            "priority": rule.priority,
+            "hits": stats["hits"].get(rule.name, 0),
+            "avg_us": stats["rule_seconds"].get(rule.name, 0.0) / checks * 1e6 if checks else None,
+        })
+
     return {
         "leadership_count": len(LEADERSHIP_EMAILS),
         "department_count": len(DEPARTMENT_EMAILS),
         "neptun_count": len(NEPTUN_ADDRESSES),
         "moodle_count": len(MOODLE_ADDRESSES),
         "milton_count": len(MILTON_ADDRESSES),
+        "custom_count": len(CUSTOM_RULES),
+        "profiling": PROFILE_RULES,
+        "rules": rules,
+        "stats": stats,
+        "sender_memo": COMPILED_RULES.memo_info(),
     }
 
 
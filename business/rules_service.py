@@ -0,0 +1,105 @@
+"""
+Rules hot reload.
+Watches the rules INI for changes and swaps in the recompiled rule set without a
+restart; subscribers are told about every swap so the UI can re-evaluate.
+"""
+
+import configparser
+import threading
+from typing import Callable, List, Optional
+
+from . import rules_engine
+from .rule_dsl import RuleSet
+
+# Called with (old_rule_set, new_rule_set) from the thread that reloaded
+RulesListener = Callable[[RuleSet, RuleSet], None]
+
+
+class RulesService:
+    """Owns reloading of the rule set and notifies subscribers of swaps"""
+
+    def __init__(self, ini_path: str = "config/settings.ini", interval: float = 2.0):
+        """Initialize service
+
+        Args:
+            ini_path: Rules INI (the one rules_engine loads)
+            interval: Poll interval of the watcher thread in seconds
+        """
+        self.ini_path = ini_path
+        self.interval = interval
+        self.version = 0  # incremented on every swap
+        self._rejected_signature = None  # unparsable INI version, reported once
+        self._listeners: List[RulesListener] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def rule_set(self) -> RuleSet:
+        """The rule set apply_rules currently uses"""
+        return rules_engine.COMPILED_RULES
+
+    def subscribe(self, listener: RulesListener) -> None:
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: RulesListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def reload(self, force: bool = False) -> bool:
+        """Recompile the rules if the INI changed since it was loaded
+
+        An INI that cannot be parsed (e.g. saved half-way by an editor) keeps the
+        current rules instead of falling back to the hardcoded ones.
+
+        Args:
+            force: Reload even if the file signature is unchanged
+
+        Returns:
+            bool: True if a new rule set was swapped in
+        """
+        with self._lock:
+            signature = rules_engine._file_signature(self.ini_path)
+            if not force and signature in (rules_engine.RULES_SIGNATURE, self._rejected_signature):
+                return False
+
+            if signature is not None:
+                try:
+                    configparser.ConfigParser().read(self.ini_path, encoding='utf-8')
+                except (configparser.Error, UnicodeDecodeError) as ex:
+                    self._rejected_signature = signature
+                    print(f"[RULES] {self.ini_path} not reloaded, keeping current rules: {ex}")
+                    return False
+
+            old_rules = rules_engine.COMPILED_RULES
+            rules_engine.load_rules_from_ini(self.ini_path)
+            new_rules = rules_engine.COMPILED_RULES
+            self.version += 1
+            print(f"[RULES] Reloaded rule set (version {self.version}, {len(new_rules)} rules)")
+
+        for listener in list(self._listeners):
+            try:
+                listener(old_rules, new_rules)
+            except Exception as ex:
+                print(f"[RULES] Listener failed: {ex}")
+        return True
+
+    def start(self) -> None:
+        """Start watching the INI (daemon thread)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="rules-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching"""
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.reload()
+
+
+# Global singleton instance
+rules_service = RulesService()
@@ -0,0 +1,121 @@
+"""
+Batched keyword / regex matcher for the rule engine.
+All subject regexes, or all body keywords, of a rule set are compiled into one
+matcher per text field, so an email's subject and body are each scanned once
+for every rule, and the scan reports which pattern ids matched.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .rule_matcher import AhoCorasick
+
+# '(?:...)' / '(...)' around the whole pattern, optionally anchored or word-bounded
+_WRAPPED = re.compile(r"\^?(?:\\b)?\((?:\?:)?(.*)\)(?:\\b)?\$?", re.S)
+# One alternative made of word characters, spaces and hyphens only
+_ALTERNATIVE = re.compile(r"\^?(?:\\b)?([\w \-]+)(?:\\b)?\$?")
+
+
+def _fold(text: str) -> str:
+    """Casefolded text in which re.IGNORECASE equivalents of a literal character stay findable
+
+    str.casefold() alone misses that re.IGNORECASE matches the dotless 'ı' with 'i' / 'I'.
+    """
+    return text.casefold().replace("ı", "i")
+
+
+def _required_literals(regex: str) -> Optional[Tuple[str, ...]]:
+    """Literals one of which occurs in every match of regex
+
+    Only plain word alternations such as 'vizsga', '\\b(vizsga|zh)\\b' or
+    '^neptun' are recognized; None for anything else.
+    """
+    wrapped = _WRAPPED.fullmatch(regex)
+    literals = []
+    for alternative in (wrapped.group(1) if wrapped else regex).split("|"):
+        match = _ALTERNATIVE.fullmatch(alternative)
+        if match is None:
+            return None
+        literals.append(match.group(1))
+    return tuple(literals)
+
+
+class TextMatcher:
+    """Which of many literal and regex patterns occur in a text
+
+    Literals are deduplicated and found with the C substring search; past
+    AC_THRESHOLD distinct literals one Aho-Corasick pass is cheaper than a search
+    per literal. Regexes are prefiltered: the words a regex cannot match without
+    are looked up together with the literals above, and only regexes whose words
+    occur (or that have none, e.g. '\\d{6}') are run. Python's re does not
+    share work between alternatives, so one merged alternation would be slower
+    than this.
+    """
+
+    AC_THRESHOLD = 256
+
+    def __init__(self, literals: Iterable[Tuple[str, int]] = (), regexes: Iterable[Tuple[str, int]] = (),
+                 flags: int = re.IGNORECASE):
+        """Compile the patterns
+
+        Args:
+            literals: (literal, id) pairs; literals must be in the case of the scanned text
+            regexes: (regex, id) pairs
+            flags: re flags of the regexes
+        """
+        by_literal: Dict[str, Set[int]] = {}
+        for literal, pattern_id in literals:
+            if literal:
+                by_literal.setdefault(literal, set()).add(pattern_id)
+        self._literals: List[Tuple[str, frozenset]] = [(lit, frozenset(ids)) for lit, ids in by_literal.items()]
+        self._automaton = None
+        if len(self._literals) > self.AC_THRESHOLD:
+            self._automaton = AhoCorasick(self._literals)
+
+        by_regex: Dict[str, Set[int]] = {}
+        for regex, pattern_id in regexes:
+            if regex:
+                by_regex.setdefault(regex, set()).add(pattern_id)
+        self._regexes: List[Tuple] = [(re.compile(regex, flags).search, frozenset(ids))
+                                      for regex, ids in by_regex.items()]
+
+        # Case-insensitive regexes are prefiltered on the casefolded text
+        self._fold = bool(flags & re.IGNORECASE)
+        required, self._unfiltered = [], []
+        for index, regex in enumerate(by_regex):
+            words = _required_literals(regex)
+            if words is None:
+                self._unfiltered.append(index)
+                continue
+            if self._fold:
+                if any(len(char.casefold()) > 1 for word in words for char in word):
+                    self._unfiltered.append(index)  # e.g. 'ß' - casefolding changes its length
+                    continue
+                words = [_fold(word) for word in words]
+            required.extend((word, index) for word in words)
+        self._prefilter = TextMatcher(literals=required) if required else None
+
+    def __bool__(self) -> bool:
+        return bool(self._literals or self._regexes)
+
+    def matches(self, text: str) -> Set[int]:
+        """Ids of every pattern occurring in text"""
+        hits: Set[int] = set()
+        if self._automaton is not None:
+            for ids in self._automaton.iter_matches(text):
+                hits |= ids
+        else:
+            for literal, ids in self._literals:
+                if literal in text:
+                    hits |= ids
+
+        if self._regexes:
+            candidates = self._unfiltered
+            if self._prefilter is not None:
+                candidates = self._prefilter.matches(_fold(text) if self._fold else text)
+                candidates.update(self._unfiltered)
+            for index in candidates:
+                search, ids = self._regexes[index]
+                if search(text) is not None:
+                    hits |= ids
+        return hits
@@ -8,7 +8,7 @@ from tkinter import messagebox
 from models.app_state import app_state
 from services import StorageService, AIServiceFactory
 from services.gmailcimke import apply_label_to_message  # ← ADDED
-from utils import strip_html_tags
+from utils import email_body_text
 
 
 class AIController:
@@ -41,13 +41,10 @@ class AIController:
 
         # Extract data
         subject = email_data.get('subject', '')
-        body_plain = email_data.get('body_plain', '')
-        body_html = email_data.get('body_html', '')
         sender = email_data.get('sender_name', '')
 
-        # Use plain text or strip HTML
-        if not body_plain and body_html:
-            body_plain = strip_html_tags(body_html)
+        # Plain text extracted once at ingest
+        body_plain = email_body_text(email_data)
 
         if not body_plain or not body_plain.strip():
             return "[Üres email törzs - nincs mit összefoglalni]"
@@ -58,16 +55,12 @@ class AIController:
         try:
             summary = self.ai_client.summarize_email(subject, body_plain, sender)
 
-            # Save to storage
-            all_emails = self.storage.load_emails()
-            email_id_map = {e.get("message_id"): e for e in all_emails}
+            # Save to storage through the shared repository (journal append)
             message_id = email_data.get('message_id')
-
-            if message_id in email_id_map:
-                email_id_map[message_id]['ai_summary'] = summary
-                email_data['ai_summary'] = summary
-
-            self.storage.save_emails(all_emails)
+            email_data['ai_summary'] = summary
+            if message_id:
+                app_state.repository.update_fields(message_id, ai_summary=summary)
+                app_state.repository.flush()
 
             print(f"[AI] Summary generated successfully")
             return summary
@@ -186,24 +179,18 @@ class AIController:
 
         subject = email_data.get("subject", "")
         #body_preview = email_data.get("body_plain", "") or email_data.get("preview_text", "")
-        body_plain = email_data.get("body_plain", "")
-        body_html = email_data.get("body_html", "")
+        body_text = email_body_text(email_data)
         preview_text = email_data.get("preview_text", "")
 
-        # Próbáljuk sorban
-        if body_plain and body_plain.strip():
-            body_preview = body_plain
-        elif body_html and body_html.strip():
-            # HTML-ből kivesszük a tag-eket egyszerűen
-            import re
-            body_preview = re.sub(r'<[^>]+>', '', body_html)  # strip HTML tags
+        # Ingestkor előállított plain text, különben a preview
+        if body_text and body_text.strip():
+            body_preview = body_text
         elif preview_text and preview_text.strip():
             body_preview = preview_text
         else:
             body_preview = ""
 
-        print(f"[AI-LABEL-DEBUG] body_plain: {len(body_plain)} kar")
-        print(f"[AI-LABEL-DEBUG] body_html: {len(body_html)} kar")
+        print(f"[AI-LABEL-DEBUG] body_text: {len(body_text)} kar")
         print(f"[AI-LABEL-DEBUG] body_preview használt: {len(body_preview)} kar")
         sender_name = email_data.get("sender_name", "")
         message_id = email_data.get("message_id")
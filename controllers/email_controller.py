@@ -2,15 +2,17 @@
 Email operations controller
 Handles fetching, categorizing, filtering, and sorting emails
 """
+import threading
 from typing import List, Dict, Optional
 from tkinter import messagebox
 from googleapiclient.errors import HttpError
-from email.utils import parseaddr
 
 from models.app_state import app_state
 from services import StorageService, GmailService
-from business import apply_rules
-from utils import format_date_hungarian
+from services.archive_service import ArchiveTiering
+from business import apply_rules, rules_signature, rules_service
+from business.rule_diff import diff_rule_sets
+from utils import apply_sender_info, format_date_hungarian
 
 
 class EmailController:
@@ -25,23 +27,79 @@ class EmailController:
         """
         self.storage = storage_service
         self.gmail = gmail_service
+        self.repository = app_state.repository
+        self.repository.storage = storage_service
+        self.archive = ArchiveTiering(storage_service)
 
     def load_offline_emails(self) -> List[Dict]:
         try:
-            emails = self.storage.load_emails()
+            # Bináris snapshot, ha még a mostani CSV-t tükrözi; különben CSV
+            emails, snapshot_rules = self.storage.load_startup_emails()
+            csv_sig = self.storage.csv_signature()
+            emails = self.repository.replace_all(emails)
             if emails:
-                # csak azokra futtatunk szabályt, ahol még nincs címke
-                uncategorized = [e for e in emails if e.get("tag", "----") == "----"]
-                if uncategorized:
-                    apply_rules(uncategorized)
-                app_state.all_emails = emails
+                current_rules = rules_signature()
+                if snapshot_rules != current_rules:
+                    # csak azokra futtatunk szabályt, ahol még nincs címke
+                    uncategorized = [e for e in emails if e.get("tag", "----") == "----"]
+                    if uncategorized:
+                        apply_rules(uncategorized)
+                        self.repository.reindex(uncategorized)
+
+                    # Következő indításhoz: kész (szabályozott, rendezett) tábla a háttérben
+                    threading.Thread(target=self.storage.write_snapshot,
+                                     args=(list(emails), current_rules, csv_sig),
+                                     name="startup-snapshot", daemon=True).start()
                 app_state.update_categorized_counts()
+
+                # Keresési index feltöltése a háttérben (csak a hiányzó levelek)
+                threading.Thread(target=self.storage.ensure_search_index, args=(list(emails),),
+                                 name="search-backfill", daemon=True).start()
             return emails
         except Exception as e:
             print(f"[ERROR] Failed to load offline emails: {e}")
             messagebox.showerror("Hiba", f"Email betöltési hiba:\n{e}")
             return []
 
+    def archive_in_background(self, run_on_ui, on_archived=None) -> None:
+        """Move old emails to the archive tier on a worker thread (at most once a day)
+
+        Args:
+            run_on_ui: Schedules a callable on the Tk thread; the repository is only changed there
+            on_archived: Called on the Tk thread with the archived message_ids
+                (after they left the repository)
+        """
+        if not self.archive.is_due():
+            return
+
+        def drop_archived(archived):
+            # The hot-tier body files are deleted once this returns - no record may point at them
+            done = threading.Event()
+            by_id = {e.message_id: e for e in archived}
+
+            def on_ui():
+                try:
+                    for email in self.repository.remove(by_id):
+                        # Still shown / referenced elsewhere until the UI drops it
+                        email["body_file"] = by_id[email.message_id].body_file
+                        email["text_file"] = by_id[email.message_id].text_file
+                    app_state.update_categorized_counts()
+                    if on_archived is not None:
+                        on_archived(set(by_id))
+                finally:
+                    done.set()
+
+            run_on_ui(on_ui)
+            done.wait()
+
+        def worker():
+            try:
+                self.archive.run_if_due(before_remove=drop_archived)
+            except Exception as e:
+                print(f"[ARCHIVE] Archiving failed: {e}")
+
+        threading.Thread(target=worker, name="archive-tiering", daemon=True).start()
+
     def fetch_new_emails(self, max_results: int = 100, progress_callback=None) -> List[Dict]:
         """Fetch new emails from Gmail
         
@@ -83,10 +141,7 @@ class EmailController:
             for idx, msg in enumerate(messages, start=1):
                 try:
                     details = self.gmail.get_email_full_details(msg["id"])
-                    name, addr = parseaddr(details.get("sender", ""))
-                    domain = addr.split("@", 1)[-1] if "@" in addr else ""
-                    details["sender_name"] = name or addr
-                    details["sender_domain"] = domain
+                    apply_sender_info(details)
                     details.setdefault("mime_types", [])
                     details.setdefault("needs_more_info", 0)
                     details.setdefault("rule_applied", "")
@@ -151,11 +206,14 @@ class EmailController:
                 progress_callback(95)
             
             # Step 4: Sync with storage (95-100%)
-            synced_emails = self.storage.sync_emails(gmail_emails)
+            # Pending edits go to storage first, then sync merges into the in-memory records
+            self.repository.flush()
+            synced_emails = self.storage.sync_emails(gmail_emails, existing_emails=list(self.repository.all()),
+                                                     rules_sig=rules_signature())
+            synced_emails = self.repository.replace_all(synced_emails)
 
             print("[DEBUG][SYNC-OUT][0]", synced_emails[0] if synced_emails else None)
             
-            app_state.all_emails = synced_emails
             app_state.update_categorized_counts()
             app_state.reset_filters()
             
@@ -210,18 +268,9 @@ class EmailController:
                               f"Használja az AI Címkézés gombot, vagy állítsa be manuálisan a jobb oldali legördülő menüből.")
             return 0
         
-        # Save changes
-        all_emails = self.storage.load_emails()
-        email_id_map = {e.get("message_id"): e for e in all_emails}
-        
-        for updated_email in uncategorized:
-            msg_id = updated_email.get("message_id")
-            if msg_id in email_id_map:
-                email_id_map[msg_id].update(updated_email)
-        
-        self.storage.save_emails(all_emails)
-        
-        app_state.all_emails = all_emails
+        # Save changes (batched journal append, no full CSV rewrite)
+        self.repository.mark_dirty(uncategorized, ("tag", "rule_applied"))
+        self.repository.flush()
         app_state.update_categorized_counts()
         
         messagebox.showinfo("Siker",
@@ -230,6 +279,89 @@ class EmailController:
         
         return newly_categorized
     
+    def reapply_rules(self, old_rules=None, new_rules=None) -> List[Dict]:
+        """Re-evaluate rules after the rule set changed
+
+        Uncategorized emails and emails tagged by a rule are evaluated again;
+        manual / Gmail / AI tags are kept. Given both rule sets, only emails whose
+        sender or domain is named by an added / removed / modified rule are touched.
+        Changes are saved in one batch and pushed to Gmail with one label call per tag.
+
+        Args:
+            old_rules: Rule set before the change (optional)
+            new_rules: Rule set after the change (optional)
+
+        Returns:
+            List of emails whose tag or rule changed (already saved)
+        """
+        if old_rules is not None and new_rules is not None:
+            diff = diff_rule_sets(old_rules, new_rules)
+            if not diff:
+                return []
+            scope = self.repository if diff.unbounded else self._affected_by(diff)
+            print(f"[RULES] Changed rules: {diff.describe()}")
+        else:
+            scope = self.repository
+
+        # rule_applied is only trusted while the tag is still the named rule's tag; the rule
+        # version that produced it is the old one
+        rules_by_name = {rule.name: rule for rule in (new_rules or rules_service.rule_set).rules}
+        if old_rules is not None:
+            rules_by_name.update((rule.name, rule) for rule in old_rules.rules)
+        candidates = [e for e in scope if e.tag == "----" or self._owned_by_rule(e, rules_by_name)]
+        before = {e.message_id: (e.tag, e.rule_applied) for e in candidates}
+
+        apply_rules(candidates, reevaluate=True)
+        changed = [e for e in candidates if (e.tag, e.rule_applied) != before[e.message_id]]
+        if changed:
+            self.repository.mark_dirty(changed, ("tag", "rule_applied"))
+            self.repository.flush()
+            app_state.update_categorized_counts()
+            self._push_labels(e for e in changed if e.tag != before[e.message_id][0])
+        print(f"[RULES] Re-evaluated {len(candidates)} emails, {len(changed)} changed")
+        return changed
+
+    @staticmethod
+    def _owned_by_rule(email: Dict, rules_by_name: Dict) -> bool:
+        """True if the email's tag still comes from the rule named in its rule_applied
+
+        Manual re-tags saved before rule_applied was cleared on them keep a stale rule
+        name; those tags are the user's. Gmail labels are not stored in the CSV, so a
+        label rule's tag cannot be re-checked on an email loaded without them.
+        """
+        rule = rules_by_name.get(email.get("rule_applied"))
+        if rule is None or rule.tag != (email.get("tag") or "").lower():
+            return False
+        return not rule.labels or bool(email.get("gmail_labels"))
+
+    def _affected_by(self, diff) -> List[Dict]:
+        """Emails whose sender address or domain a changed rule names"""
+        affected = {}
+        for address in diff.addresses:
+            for email in self.repository.by_sender(address):
+                affected[email.message_id] = email
+        for domain in self.repository.sender_domains():
+            if diff.matches_domain(domain):
+                for email in self.repository.by_domain(domain):
+                    affected[email.message_id] = email
+        return list(affected.values())
+
+    def _push_labels(self, emails) -> None:
+        """Update Gmail labels of re-tagged emails in the background (one batch per tag)"""
+        if not self.gmail or not hasattr(self.gmail, "set_messages_label") or self.storage.is_test_mode():
+            return
+        by_tag: Dict[str, List[str]] = {}
+        for email in emails:
+            by_tag.setdefault(email.tag, []).append(email.message_id)
+        if not by_tag:
+            return
+
+        def push():
+            for tag, message_ids in by_tag.items():
+                self.gmail.set_messages_label(message_ids, tag)
+
+        threading.Thread(target=push, name="gmail-relabel", daemon=True).start()
+
     def filter_by_tag(self, tag: str, all_items: List[str], tree_widget) -> List[str]:
         """Filter emails by tag
         
@@ -245,10 +377,9 @@ class EmailController:
         
         for item_id in all_items:
             if tree_widget.exists(item_id):
-                email_data = app_state.email_data_map.get(item_id, {})
-                item_tag = email_data.get('tag', '----')
+                email_data = app_state.email_data_map.get(item_id)
                 
-                if item_tag == tag:
+                if email_data is not None and email_data.tag == tag:
                     try:
                         tree_widget.move(item_id, "", "end")
                         visible_items.append(item_id)
@@ -276,9 +407,9 @@ class EmailController:
         
         for item_id in all_items:
             if tree_widget.exists(item_id):
-                email_data = app_state.email_data_map.get(item_id, {})
+                email_data = app_state.email_data_map.get(item_id)
                 
-                if int(email_data.get("attachment_count", 0)) > 0:
+                if email_data is not None and email_data.attachment_count > 0:
                     try:
                         tree_widget.move(item_id, "", "end")
                         visible_items.append(item_id)
@@ -293,6 +424,53 @@ class EmailController:
         
         return visible_items
     
+    def filter_by_search(self, query: str, all_items: List[str], tree_widget,
+                         insert_archived=None) -> List[str]:
+        """Filter emails by full-text search (subject, sender, body)
+        
+        Args:
+            query: Free text search query
+            all_items: List of all treeview item IDs
+            tree_widget: Treeview widget
+            insert_archived: Callback adding an archived email to the tree (returns item ID);
+                archived hits are only shown if given
+            
+        Returns:
+            List of visible item IDs, best match first
+        """
+        hits = self.storage.search(query)
+        rank = {msg_id: pos for pos, msg_id in enumerate(hits)}
+
+        # Archív találatok: igény szerint töltjük be, a munkakészletbe nem kerülnek
+        if insert_archived is not None:
+            missing = [msg_id for msg_id in hits if msg_id not in self.repository]
+            for email in self.storage.load_archived(missing):
+                insert_archived(email)
+        
+        matching = []
+        for item_id in all_items:
+            if tree_widget.exists(item_id):
+                email_data = app_state.email_data_map.get(item_id)
+                pos = rank.get(email_data.message_id) if email_data is not None else None
+                if pos is None:
+                    tree_widget.detach(item_id)
+                else:
+                    matching.append((pos, item_id))
+        
+        matching.sort()
+        visible_items = []
+        for idx, (_, item_id) in enumerate(matching):
+            try:
+                tree_widget.move(item_id, "", idx)
+                visible_items.append(item_id)
+            except:
+                pass
+        
+        app_state.is_filtered = True
+        app_state.current_filter_label = f"Keresés: {query}"
+        
+        return visible_items
+    
     def clear_filters(self, all_items: List[str], tree_widget):
         """Clear all filters
         
@@ -324,43 +502,35 @@ class EmailController:
                 if item_id in app_state.email_data_map]
         
         if sort_column == "Sender":
-            items.sort(key=lambda x: x[1].get("sender_name", "").lower(), reverse=reverse)
+            items.sort(key=lambda x: x[1].sender_name.lower(), reverse=reverse)
         elif sort_column == "Subject":
-            items.sort(key=lambda x: x[1].get("subject", "").lower(), reverse=reverse)
+            items.sort(key=lambda x: x[1].subject.lower(), reverse=reverse)
         elif sort_column == "Tag":
-            items.sort(key=lambda x: x[1].get("tag", "").lower(), reverse=reverse)
+            items.sort(key=lambda x: x[1].tag.lower(), reverse=reverse)
         elif sort_column == "Attach":
-            items.sort(key=lambda x: int(x[1].get("attachment_count", 0)), reverse=reverse)
+            items.sort(key=lambda x: x[1].attachment_count, reverse=reverse)
         elif sort_column == "AI":
-            items.sort(key=lambda x: 1 if x[1].get("ai_summary") else 0, reverse=reverse)
+            items.sort(key=lambda x: 1 if x[1].ai_summary else 0, reverse=reverse)
         elif sort_column == "Date":
-            items.sort(key=lambda x: x[1].get("datetime", ""), reverse=reverse)
+            items.sort(key=lambda x: x[1].datetime, reverse=reverse)
         
         return items
 
     def update_tag_for_email(self, updated_email: Dict, new_tag: str) -> None:
-        """Egy email címkéjének frissítése és mentése CSV-be (message_id alapján)."""
-        try:
-            all_emails = self.storage.load_emails()
-        except Exception as e:
-            print(f"[ERROR] Cannot load emails for tag update: {e}")
-            return
-
-        email_id_map = {e.get("message_id"): e for e in all_emails}
+        """Egy email címkéjének frissítése és mentése (journal append, message_id alapján)."""
         msg_id = updated_email.get("message_id")
-
-        if not msg_id or msg_id not in email_id_map:
-            print(f"[WARN] Email with message_id={msg_id} not found in storage; tag not saved.")
+        if not msg_id:
+            print("[WARN] Email without message_id; tag not saved.")
             return
 
-        email_in_storage = email_id_map[msg_id]
-        email_in_storage["tag"] = new_tag
+        updated_email["tag"] = new_tag
 
         try:
-            self.storage.save_emails(all_emails)
-            app_state.all_emails = all_emails
+            # Kézi címke: már nem szabály eredménye, szabályváltozás nem írja felül
+            self.repository.update_fields(msg_id, tag=new_tag, rule_applied="")
+            if self.repository.flush():
+                print(f"[INFO] Tag saved for message_id={msg_id}: {new_tag}")
             app_state.update_categorized_counts()
-            print(f"[INFO] Tag saved for message_id={msg_id}: {new_tag}")
         except Exception as e:
             print(f"[ERROR] Failed to save tag change: {e}")
 
@@ -4,6 +4,7 @@ Main entry point using modular architecture
 """
 import sys
 import os
+import multiprocessing
 
 # Fix tkhtmlview compatibility
 from PIL import Image
@@ -15,6 +16,8 @@ if not hasattr(Image, 'ANTIALIAS'):
 from services import StorageService, GmailService, AIServiceFactory  # ← ADDED GmailService
 from controllers import EmailController, AIController, AuthController
 from models import app_state
+from business import rules_service
+from utils.config_helper import get_config_value
 
 
 def main():
@@ -28,6 +31,9 @@ def main():
     print("[INIT] Initializing services...")
     storage_service = StorageService()
     app_state.email_storage = storage_service
+    if not storage_service.acquire_store_lock():
+        print("[INIT] ⚠ Another process (e.g. an NDJSON import) is using the data directory")
+    storage_service.start_layout_migration()
 
     # ========== ADDED: GmailService initialization ==========
     gmail_service = GmailService()
@@ -40,6 +46,11 @@ def main():
     email_controller = EmailController(storage_service, gmail_service)  # ← MODIFIED: pass gmail_service
     ai_controller = AIController(storage_service, ai_provider="perplexity")
 
+    # Rules hot reload (config/settings.ini changes apply without restart)
+    if get_config_value('general', 'watch_rules', fallback='true').strip().lower() in ('1', 'true', 'yes', 'on'):
+        rules_service.interval = float(get_config_value('general', 'rules_watch_interval_s', fallback='2'))
+        rules_service.start()
+
     # Check auto-login
     print("[INIT] Checking authentication...")
     gmail_client = auth_controller.check_auto_login()
@@ -72,4 +83,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Rule evaluation process pool in a frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     main()
@@ -2,10 +2,12 @@
 Data models for Sortify
 """
 from .email_model import Email
+from .email_repository import EmailRepository
 from .app_state import AppState, app_state
 
 __all__ = [
     'Email',
+    'EmailRepository',
     'AppState',
     'app_state',
 ]
@@ -4,15 +4,18 @@ Global application state management
 from typing import Dict, List, Set, Optional
 from dataclasses import dataclass, field
 
+from .email_repository import EmailRepository
+
 
 @dataclass
 class AppState:
     """Application state container"""
 
-    # Email data
-    all_emails: List[Dict] = field(default_factory=list)
+    # Email data (single identity map shared by controllers and UI)
+    repository: EmailRepository = field(default_factory=EmailRepository)
     email_data_map: Dict[str, Dict] = field(default_factory=dict)
     all_tree_items: List[str] = field(default_factory=list)
+    archived_tree_items: List[str] = field(default_factory=list)  # archived search hits
 
     # Filter state
     is_filtered: bool = False
@@ -42,6 +45,15 @@ class AppState:
     email_storage: Optional[object] = None
     gmail_service: Optional[object] = None  # ← ADDED from branch1
 
+    @property
+    def all_emails(self) -> List[Dict]:
+        """All emails of the shared repository"""
+        return self.repository.all()
+
+    @all_emails.setter
+    def all_emails(self, emails: List[Dict]):
+        self.repository.replace_all(emails)
+
     def reset_filters(self):
         """Reset all filter states"""
         self.is_filtered = False
@@ -50,17 +62,13 @@ class AppState:
 
     def update_categorized_counts(self):
         """Update categorized counts from all_emails"""
+        tag_counts = self.repository.tag_counts()
         for tag in self.categorized_counts:
-            self.categorized_counts[tag] = 0
-
-        for email in self.all_emails:
-            tag = email.get("tag", "----")
-            if tag in self.categorized_counts:
-                self.categorized_counts[tag] += 1
+            self.categorized_counts[tag] = tag_counts.get(tag, 0)
 
     def get_attachment_count(self) -> int:
         """Get total number of emails with attachments"""
-        return sum(1 for e in self.all_emails if int(e.get("attachment_count", 0)) > 0)
+        return sum(1 for e in self.all_emails if e.attachment_count > 0)
 
     def is_authenticated(self) -> bool:
         """Check if user is authenticated with Gmail"""
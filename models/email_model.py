@@ -1,9 +1,14 @@
 """
 Email data model
 """
+import re
+import sys
+from collections.abc import MutableMapping
 from dataclasses import dataclass, field
 from typing import Optional, List
 
+from utils.html_utils import html_to_text
+
 
 @dataclass
 class Email:
@@ -96,3 +101,161 @@ class Email:
     def is_categorized(self) -> bool:
         """Check if email is categorized (has tag other than ----)"""
         return self.tag != "----"
+
+
+def _split_list(value) -> tuple:
+    """Normalize 'a|b' / 'a;b' strings and lists to a tuple of interned strings"""
+    if isinstance(value, str):
+        value = re.split(r'[;|]', value)
+    return tuple(sys.intern(str(v).strip()) for v in (value or ()) if str(v).strip())
+
+
+def _intern(value) -> str:
+    return sys.intern(value) if isinstance(value, str) else ("" if value is None else value)
+
+
+class EmailRecord(MutableMapping):
+    """Compact in-memory email record
+
+    Slot-based replacement for the ~20 key email dicts: sender, domain, tag and
+    MIME values are interned, and bodies are not held in memory - 'body_html' /
+    'body_plain' are resolved through EmailRecord.body_loader from 'body_file',
+    'body_text' (plain text extracted at ingest) from 'text_file'.
+    Keeps the dict interface (get / [] / update / setdefault) used across the app.
+    """
+
+    FIELDS = (
+        "message_id", "sender", "sender_name", "sender_domain", "sender_address",
+        "sender_reg_domain", "subject", "datetime", "attachment_count", "attachment_names",
+        "mime_types", "tag", "is_last_downloaded", "needs_more_info", "rule_applied",
+        "body_file", "body_format", "ai_summary", "text_file",
+    )
+    BODY_FIELDS = ("body_html", "body_plain", "body_text")
+    _INTERNED = frozenset(("sender", "sender_name", "sender_domain", "sender_address", "sender_reg_domain",
+                           "tag", "rule_applied", "body_format"))
+    _LISTS = frozenset(("attachment_names", "mime_types"))
+    _INTS = frozenset(("attachment_count", "is_last_downloaded", "needs_more_info"))
+    _DEFAULTS = {"tag": "----", "attachment_count": 0, "is_last_downloaded": 0,
+                 "needs_more_info": 0, "attachment_names": (), "mime_types": ()}
+
+    __slots__ = FIELDS + ("_extra",)
+
+    # body_file -> (body_html, body_plain); set by StorageService
+    body_loader = None
+    # list of records -> their 'body_text' in order, read in bulk; set by StorageService
+    texts_loader = None
+
+    def __init__(self, data=None, **kwargs):
+        for name in self.FIELDS:
+            object.__setattr__(self, name, self._DEFAULTS.get(name, ""))
+        self._extra = None
+        if data:
+            self.update(data)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def from_mapping(cls, data) -> 'EmailRecord':
+        """Convert a plain email dict (CSV row / Gmail details) to a record"""
+        return data if isinstance(data, cls) else cls(data)
+
+    # ---------- Mapping interface ----------
+
+    def __getitem__(self, key):
+        if key in self.__slots__ and key != "_extra":
+            return getattr(self, key)
+        if key in self.BODY_FIELDS:
+            return self._load_body(key)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in self._LISTS:
+            value = _split_list(value)
+        elif key in self._INTS:
+            try:
+                value = int(value or 0)
+            except (TypeError, ValueError):
+                value = 0
+        elif key in self._INTERNED:
+            value = _intern(value)
+
+        if key in self.FIELDS:
+            object.__setattr__(self, key, value)
+        elif key in self.BODY_FIELDS and self.body_file:
+            # Body is persisted in body_file - do not keep a second copy in memory
+            return
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self.FIELDS:
+            object.__setattr__(self, key, self._DEFAULTS.get(key, ""))
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        elif key not in self.BODY_FIELDS:
+            raise KeyError(key)
+
+    def __iter__(self):
+        # Bodies behind body_file / text_file are not iterated: generic mapping
+        # operations (update, dict(), copy()) must not read them from disk
+        yield from self.FIELDS
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return len(self.FIELDS) + len(self._extra or ())
+
+    def __contains__(self, key):
+        return key in self.FIELDS or key in self.BODY_FIELDS or bool(self._extra and key in self._extra)
+
+    def clear(self):
+        """Reset all fields (keeps object identity)"""
+        for name in self.FIELDS:
+            object.__setattr__(self, name, self._DEFAULTS.get(name, ""))
+        self._extra = None
+
+    def copy(self) -> dict:
+        """Plain dict copy (bodies stored on disk are left out - read them with record['body_html'])"""
+        return dict(self.items())
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.FIELDS), self._extra
+
+    def __setstate__(self, state):
+        values, extra = state
+        for name, value in zip(self.FIELDS, values):
+            object.__setattr__(self, name, value)
+        self._extra = extra
+
+    def __repr__(self):
+        return f"EmailRecord(message_id={self.message_id!r}, subject={self.subject!r}, tag={self.tag!r})"
+
+    # ---------- Body access ----------
+
+    def _load_body(self, key: str) -> str:
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        if key == "body_text":
+            return self._load_text()
+        if not self.body_file or EmailRecord.body_loader is None:
+            return ""
+        body_html, body_plain = EmailRecord.body_loader(self.body_file)
+        return body_html if key == "body_html" else body_plain
+
+    def _load_text(self) -> str:
+        if self.text_file and EmailRecord.body_loader is not None:
+            return EmailRecord.body_loader(self.text_file)[1]
+
+        # Rows stored before text extraction: derive from the raw body
+        body_plain = self._load_body("body_plain")
+        if body_plain.strip():
+            return body_plain
+        return html_to_text(self._load_body("body_html"))
+
+    def has_attachments(self) -> bool:
+        """Check if email has attachments"""
+        return self.attachment_count > 0
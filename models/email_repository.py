@@ -0,0 +1,263 @@
+"""
+In-memory email repository
+Single identity map (message_id -> email dict) shared by every controller and the UI,
+with secondary indexes by tag, sender, sender domain and date, and batched dirty-record flushing.
+"""
+import bisect
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils.sender_utils import normalize_sender
+from .email_model import EmailRecord
+
+
+class EmailRepository:
+    """Identity map of all loaded emails"""
+
+    def __init__(self, storage=None):
+        """Initialize repository
+
+        Args:
+            storage: StorageService used for loading and flushing (can be set later)
+        """
+        self.storage = storage
+
+        self._emails: List[Dict] = []
+        self._by_id: Dict[str, Dict] = {}
+
+        # Secondary indexes
+        self._tag_of: Dict[str, str] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._by_sender: Dict[str, Set[str]] = {}
+        self._by_domain: Dict[str, Set[str]] = {}
+        self._date_keys: List[tuple] = []
+        self._date_index_valid = False
+
+        # message_id -> set of changed field names
+        self._dirty: Dict[str, Set[str]] = {}
+
+    # ---------- Loading ----------
+
+    def load_from_storage(self) -> List[Dict]:
+        """(Re)load all emails from storage into the identity map"""
+        if self.storage is None:
+            return []
+        return self.replace_all(self.storage.load_emails())
+
+    def replace_all(self, emails: Iterable[Dict]) -> List[Dict]:
+        """Replace repository contents, keeping the identity of already known records
+
+        Args:
+            emails: Fresh email dicts (e.g. result of sync)
+
+        Returns:
+            List of canonical email dicts
+        """
+        old_by_id = self._by_id
+        self._emails = []
+        self._by_id = {}
+        self._tag_of.clear()
+        self._by_tag.clear()
+        self._by_sender.clear()
+        self._by_domain.clear()
+
+        for email in emails:
+            msg_id = email.get("message_id")
+            if not msg_id or msg_id in self._by_id:
+                continue
+
+            email = EmailRecord.from_mapping(email)
+            existing = old_by_id.get(msg_id)
+            if existing is not None and existing is not email:
+                existing.clear()
+                existing.update(email)
+                email = existing
+
+            self._emails.append(email)
+            self._by_id[msg_id] = email
+            self._index(email)
+
+        self._date_index_valid = False
+        self._dirty = {k: v for k, v in self._dirty.items() if k in self._by_id}
+        return self._emails
+
+    def upsert(self, email: Dict) -> Dict:
+        """Add a new email or merge into the existing record
+
+        Returns:
+            The canonical email dict
+        """
+        email = EmailRecord.from_mapping(email)
+        msg_id = email.message_id
+        existing = self._by_id.get(msg_id)
+        if existing is None:
+            self._emails.append(email)
+            self._by_id[msg_id] = email
+            self._index(email)
+            self._date_index_valid = False
+            return email
+
+        if existing is not email:
+            self._unindex(existing)
+            existing.update(email)
+            self._index(existing)
+            self._date_index_valid = False
+        return existing
+
+    def remove(self, message_ids: Iterable[str]) -> List[EmailRecord]:
+        """Drop emails from the identity map (e.g. after they moved to the archive tier)
+
+        Returns:
+            The removed records
+        """
+        removed = [self._by_id.pop(msg_id) for msg_id in set(message_ids) if msg_id in self._by_id]
+        if not removed:
+            return []
+        for email in removed:
+            self._unindex(email)
+            self._dirty.pop(email.message_id, None)
+        # In place: all() hands out this list
+        self._emails[:] = [e for e in self._emails if e.message_id in self._by_id]
+        self._date_index_valid = False
+        return removed
+
+    # ---------- Access ----------
+
+    def all(self) -> List[EmailRecord]:
+        """All emails (shared list - do not replace items in it)"""
+        return self._emails
+
+    def get(self, message_id: str) -> Optional[Dict]:
+        """Email by message_id"""
+        return self._by_id.get(message_id)
+
+    def __len__(self) -> int:
+        return len(self._emails)
+
+    def __iter__(self):
+        return iter(self._emails)
+
+    def __contains__(self, message_id) -> bool:
+        return message_id in self._by_id
+
+    def by_tag(self, tag: str) -> List[Dict]:
+        """Emails with the given tag"""
+        return [self._by_id[i] for i in self._by_tag.get(tag, ())]
+
+    def by_sender(self, address: str) -> List[Dict]:
+        """Emails from the given sender address (case-insensitive)"""
+        return [self._by_id[i] for i in self._by_sender.get(address.strip().lower(), ())]
+
+    def by_domain(self, domain: str) -> List[Dict]:
+        """Emails whose sender_domain is the given domain (case-insensitive)"""
+        return [self._by_id[i] for i in self._by_domain.get(domain.strip().lower(), ())]
+
+    def sender_domains(self) -> List[str]:
+        """Distinct (lowercased) sender domains"""
+        return [domain for domain, ids in self._by_domain.items() if ids]
+
+    def by_date_range(self, start: str = "", end: str = "\uffff") -> List[Dict]:
+        """Emails whose 'datetime' (YYYY.MM.DD HH:MM) falls into [start, end]"""
+        if not self._date_index_valid:
+            self._date_keys = sorted((e.datetime, e.message_id) for e in self._emails)
+            self._date_index_valid = True
+
+        lo = bisect.bisect_left(self._date_keys, (start, ""))
+        hi = bisect.bisect_right(self._date_keys, (end, "\uffff"))
+        return [self._by_id[msg_id] for _, msg_id in self._date_keys[lo:hi]]
+
+    def tag_counts(self) -> Dict[str, int]:
+        """Number of emails per tag"""
+        return {tag: len(ids) for tag, ids in self._by_tag.items()}
+
+    # ---------- Mutation & flushing ----------
+
+    def update_fields(self, message_id: str, **fields) -> Optional[Dict]:
+        """Change fields of one email, keep indexes current and mark it dirty"""
+        email = self._by_id.get(message_id)
+        if email is None:
+            return None
+
+        self._unindex(email)
+        email.update(fields)
+        self._index(email)
+        if "datetime" in fields:
+            self._date_index_valid = False
+
+        self._dirty.setdefault(message_id, set()).update(fields)
+        return email
+
+    def mark_dirty(self, emails: Iterable[Dict], fields: Iterable[str]) -> None:
+        """Register in-place changes (e.g. made by apply_rules) for the next flush"""
+        fields = set(fields)
+        for email in emails:
+            msg_id = email.get("message_id")
+            if msg_id not in self._by_id:
+                continue
+            self._reindex_tag(email)
+            self._dirty.setdefault(msg_id, set()).update(fields)
+
+    def reindex(self, emails: Iterable[Dict]) -> None:
+        """Refresh the tag index after in-place changes that need no persisting"""
+        for email in emails:
+            if email.get("message_id") in self._by_id:
+                self._reindex_tag(email)
+
+    def dirty_count(self) -> int:
+        """Number of records waiting to be flushed"""
+        return len(self._dirty)
+
+    def flush(self) -> int:
+        """Write all dirty records to storage in one batch
+
+        Returns:
+            int: Number of flushed records (0 if the write failed - the edits stay dirty)
+        """
+        if not self._dirty or self.storage is None:
+            return 0
+
+        # Edits made while the write runs land in the fresh dict
+        dirty, self._dirty = self._dirty, {}
+        updates = [
+            (msg_id, {f: self._by_id[msg_id].get(f) for f in fields})
+            for msg_id, fields in dirty.items()
+            if msg_id in self._by_id
+        ]
+        written = self.storage.update_emails_fields(updates)
+        if written < 0:
+            for msg_id, fields in dirty.items():
+                self._dirty.setdefault(msg_id, set()).update(fields)
+            return 0
+        return written
+
+    # ---------- Index maintenance ----------
+
+    @staticmethod
+    def _sender_key(email: EmailRecord) -> str:
+        return email.sender_address or normalize_sender(email.sender).address
+
+    def _index(self, email: EmailRecord) -> None:
+        msg_id = email.message_id
+        tag = email.tag or "----"
+        self._tag_of[msg_id] = tag
+        self._by_tag.setdefault(tag, set()).add(msg_id)
+        self._by_sender.setdefault(self._sender_key(email), set()).add(msg_id)
+        self._by_domain.setdefault(email.sender_domain.lower(), set()).add(msg_id)
+
+    def _unindex(self, email: EmailRecord) -> None:
+        msg_id = email.message_id
+        tag = self._tag_of.pop(msg_id, None)
+        if tag is not None:
+            self._by_tag.get(tag, set()).discard(msg_id)
+        self._by_sender.get(self._sender_key(email), set()).discard(msg_id)
+        self._by_domain.get(email.sender_domain.lower(), set()).discard(msg_id)
+
+    def _reindex_tag(self, email: EmailRecord) -> None:
+        msg_id = email.message_id
+        new_tag = email.tag or "----"
+        old_tag = self._tag_of.get(msg_id)
+        if old_tag == new_tag:
+            return
+        if old_tag is not None:
+            self._by_tag.get(old_tag, set()).discard(msg_id)
+        self._tag_of[msg_id] = new_tag
+        self._by_tag.setdefault(new_tag, set()).add(msg_id)
@@ -0,0 +1,189 @@
+"""
+Archive tiering (cold storage)
+Emails older than [archive] body_age_days leave the working set: their bodies are
+moved into compressed archive segments and their rows into '<csv>.archive.csv'.
+Archived emails stay in the search index and are loaded on demand.
+"""
+import csv
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from utils.config_helper import get_config_value
+from .body_layout import resolve_body_path
+from .body_store import BodyPackStore
+
+ARCHIVE_PREFIX = "archive:"
+ARCHIVE_DIR = "data/archive"
+ARCHIVE_SEGMENTS_DIR = os.path.join(ARCHIVE_DIR, "segments")
+
+# The tiering pass rewrites the working CSV, so it runs at most this often
+_RUN_INTERVAL = 24 * 3600
+
+
+class ArchiveTiering:
+    """Moves old emails from the working set into the archive tier"""
+
+    def __init__(self, storage, body_age_days: Optional[int] = None):
+        """Initialize tiering
+
+        Args:
+            storage: StorageService
+            body_age_days: Archive emails older than this many days
+                (default: [archive] body_age_days, 0 disables archiving)
+        """
+        self.storage = storage
+        if body_age_days is None:
+            body_age_days = int(get_config_value('archive', 'body_age_days', fallback='0'))
+        self.body_age_days = body_age_days
+        self.stamp_path = os.path.join(ARCHIVE_DIR, "last_run")
+
+    @property
+    def enabled(self) -> bool:
+        return self.body_age_days > 0
+
+    def cutoff(self) -> str:
+        """Datetime string ('YYYY.MM.DD HH:MM') before which emails are archived"""
+        return (datetime.now() - timedelta(days=self.body_age_days)).strftime("%Y.%m.%d %H:%M")
+
+    def is_due(self) -> bool:
+        """True if archiving is enabled and did not run in the last 24 hours"""
+        if not self.enabled or self.storage.is_test_mode():
+            return False
+        try:
+            return time.time() - os.path.getmtime(self.stamp_path) > _RUN_INTERVAL
+        except OSError:
+            return True
+
+    def run_if_due(self, before_remove: Optional[Callable[[List[Dict]], None]] = None) -> int:
+        """Archive old emails unless a recent pass already did"""
+        return self.run(before_remove) if self.is_due() else 0
+
+    def run(self, before_remove: Optional[Callable[[List[Dict]], None]] = None) -> int:
+        """Move emails older than the cutoff into the archive tier
+
+        Can run next to the loaded working set (e.g. on a worker thread): rows are
+        selected, their bodies copied and the working CSV rewritten under the storage
+        lock, so no save can interleave; edits journaled meanwhile go to the archive rows.
+
+        Args:
+            before_remove: Called with the archived records (archive refs in body_file /
+                text_file) before the hot-tier body files are deleted - the place to point
+                or drop the repository's records
+
+        Returns:
+            int: Number of archived emails
+        """
+        storage = self.storage
+        if not self.enabled or storage.is_test_mode():
+            return 0
+
+        cutoff = self.cutoff()
+
+        def is_old(row):
+            return bool(row.get("datetime")) and row["datetime"] < cutoff
+
+        # Archived emails stay searchable: index them before the lock (slow, needs no consistency)
+        storage.ensure_search_index(list(storage.iter_emails(where=is_old)))
+
+        with storage.exclusive():
+            old = list(storage.iter_emails(where=is_old))
+            if not old:
+                self._touch_stamp()
+                return 0
+            storage.ensure_search_index(old)  # rows added since the pass above
+
+            moved_files = self._copy_bodies(old)
+            self._append_archive_rows(old)
+            changes = storage.remove_emails(e.message_id for e in old)
+            if changes is None:
+                # Working CSV still references the hot-tier files - keep them, retry next launch
+                return 0
+            if changes:
+                # Edits journaled after the rows were read; the bodies keep their archive refs
+                for email in old:
+                    email.update({k: v for k, v in changes.get(email.message_id, {}).items()
+                                  if k not in ("body_file", "text_file")})
+                self._append_archive_rows(old)
+        self._touch_stamp()
+
+        if before_remove is not None:
+            before_remove(old)
+
+        old_ids = {e.message_id for e in old}
+        with storage.exclusive():
+            # A save between the rewrite and before_remove may have written archived rows back
+            if any(True for _ in storage.iter_emails(where=lambda row: row.get("message_id") in old_ids)):
+                storage.remove_emails(old_ids)
+            self._remove_files(moved_files)
+
+        print(f"[ARCHIVE] Archived {len(old)} emails older than {cutoff}")
+        return len(old)
+
+    def _copy_bodies(self, emails: List[Dict]) -> List[str]:
+        """Copy bodies and texts into archive segments, pointing the records at them
+
+        Returns:
+            The hot-tier references the records pointed at before
+        """
+        storage = self.storage
+        segments = storage.archive_store()
+        moved_files = []
+        for email, body_html, body_plain in storage.iter_with_bodies(emails):
+            old_body, old_text = email.body_file, email.text_file
+            content = body_html or body_plain
+            if content:
+                ext = "html" if body_html else "txt"
+                email["body_file"] = segments.put(content, ext)
+            if old_text and old_text != old_body:
+                text = storage.load_body_from_file_raw(old_text, cached=False)[1]
+                email["text_file"] = segments.put(text, "text") if text else ""
+            elif old_text:
+                email["text_file"] = email.body_file
+            moved_files.extend(ref for ref in (old_body, old_text) if ref)
+        return moved_files
+
+    def _append_archive_rows(self, emails: List[Dict]) -> None:
+        """Merge rows into the archive CSV (a re-archived message replaces its old row)"""
+        path = self.storage.archive_csv_path
+        rows: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    rows[row.get("message_id")] = row
+        for email in emails:
+            rows[email.message_id] = self.storage.email_to_row(email)
+
+        self.storage._write_rows_atomic(self.storage.CSV_FIELDNAMES, rows.values(), path)
+
+    def _remove_files(self, refs: List[str]) -> None:
+        """Delete the hot-tier body files (pack store entries are append-only and stay)"""
+        for ref in set(refs):
+            if BodyPackStore.is_ref(ref) or ref.startswith(ARCHIVE_PREFIX):
+                continue
+            path = resolve_body_path(ref)
+            if path is None:
+                continue
+            try:
+                os.remove(path)
+                self.storage.body_cache.invalidate(ref)
+            except OSError as e:
+                print(f"[ARCHIVE] Could not remove {path}: {e}")
+
+    def _touch_stamp(self) -> None:
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        with open(self.stamp_path, 'w', encoding='utf-8') as f:
+            f.write(datetime.now().isoformat())
+
+
+if __name__ == "__main__":
+    import sys
+    from services.storage_service import StorageService
+
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    tiering = ArchiveTiering(StorageService(), body_age_days=days)
+    if not tiering.enabled:
+        print("Usage: python -m services.archive_service [DAYS]  (or set [archive] body_age_days)")
+        sys.exit(1)
+    tiering.run()
@@ -0,0 +1,99 @@
+"""
+Memory-budgeted LRU cache for decoded message bodies
+Bodies are read through this cache instead of being kept in every email record,
+so memory stays bounded regardless of mailbox size.
+"""
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+class BodyCache:
+    """Thread-safe LRU cache of body contents with a byte budget"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        """Initialize cache
+
+        Args:
+            max_bytes: Memory budget for cached bodies (0 disables caching)
+        """
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, loader: Callable[[str], Optional[str]]) -> Optional[str]:
+        """Return cached content, loading (and caching) it on a miss
+
+        Args:
+            key: Body reference (file path / pack reference)
+            loader: Called with key on a miss; None results are not cached
+        """
+        with self._lock:
+            content = self._items.get(key)
+            if content is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return content
+            self.misses += 1
+
+        content = loader(key)
+        if content is not None:
+            self.put(key, content)
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        """Insert content and evict least recently used entries over the budget"""
+        size = sys.getsizeof(content)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._items:
+                self._bytes -= self._sizes[key]
+            self._items[key] = content
+            self._items.move_to_end(key)
+            self._sizes[key] = size
+            self._bytes += size
+
+            while self._bytes > self.max_bytes:
+                old_key, _ = self._items.popitem(last=False)
+                self._bytes -= self._sizes.pop(old_key)
+                self.evictions += 1
+
+    def invalidate(self, key: str) -> None:
+        """Drop one entry (e.g. after the body file was rewritten)"""
+        with self._lock:
+            if self._items.pop(key, None) is not None:
+                self._bytes -= self._sizes.pop(key)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Return cache statistics
+
+        Returns:
+            dict with 'entries', 'bytes', 'max_bytes', 'hits', 'misses', 'evictions', 'hit_rate'
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._items),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
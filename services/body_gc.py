@@ -0,0 +1,177 @@
+"""
+Orphan / stale body garbage collector
+Compares the files under data/bodies/ with the body references of every stored
+data set and removes (or archives) files nothing points to any more.
+"""
+import csv
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional, Set
+
+from .archive_service import ARCHIVE_PREFIX
+from .body_layout import BODIES_DIR
+from .body_store import PACK_PREFIX
+from .metadata_journal import MetadataJournal
+
+BODY_FILE_EXTENSIONS = (".html", ".txt", ".text")
+_SEGMENT_PREFIXES = (PACK_PREFIX, ARCHIVE_PREFIX)
+
+
+def collect_live_names(csv_paths: Iterable[str]) -> Set[str]:
+    """File names ('<message_id>.<ext>') referenced by the given CSVs and their journals
+
+    Names are compared instead of full paths, so references to the old flat
+    layout still protect files already moved to the sharded layout.
+    """
+    live = set()
+    for csv_path in csv_paths:
+        if not os.path.exists(csv_path):
+            continue
+
+        overlay = MetadataJournal(csv_path + ".journal").replay()
+        with open(csv_path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                changes = overlay.get(row.get("message_id"))
+                if changes:
+                    row.update(changes)
+                for ref in (row.get("body_file"), row.get("text_file")):
+                    # Pack / archive segment references are not files
+                    if ref and not ref.startswith(_SEGMENT_PREFIXES):
+                        live.add(os.path.basename(ref))
+    return live
+
+
+def iter_body_files(root: str = BODIES_DIR):
+    """Yield DirEntry objects of all body files (flat and sharded), skipping the pack store"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name != "packs":
+                            stack.append(entry.path)
+                    elif entry.name.endswith(BODY_FILE_EXTENSIONS):
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+class BodyGarbageCollector:
+    """Removes or archives body files that no stored email references"""
+
+    def __init__(self, storage, root: str = BODIES_DIR, grace_seconds: float = 3600,
+                 archive_dir: Optional[str] = None, max_workers: Optional[int] = None):
+        """Initialize collector
+
+        Args:
+            storage: StorageService (its production and test CSVs are both consulted)
+            root: Bodies directory
+            grace_seconds: Files modified more recently are never collected - a running
+                sync writes bodies before the CSV snapshot that references them
+            archive_dir: Move orphans here instead of deleting them
+            max_workers: Threads for removing / moving files (default: storage.io_workers)
+        """
+        self.storage = storage
+        self.root = root
+        self.grace_seconds = grace_seconds
+        self.archive_dir = archive_dir
+        self.max_workers = max_workers or getattr(storage, "io_workers", 8)
+
+    def csv_paths(self) -> List[str]:
+        """Every metadata file whose references keep bodies alive"""
+        paths = [self.storage.default_csv_path, self.storage.test_csv_path]
+        paths += [os.path.splitext(p)[0] + ".archive.csv" for p in list(paths)]
+        return [p for p in paths if p]
+
+    def find_orphans(self) -> tuple:
+        """Return (orphan entries, scanned count, recent-skipped count)"""
+        live = collect_live_names(self.csv_paths())
+        cutoff = time.time() - self.grace_seconds
+
+        orphans = []
+        scanned = recent = 0
+        for entry in iter_body_files(self.root):
+            scanned += 1
+            if entry.name in live:
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if stat.st_mtime > cutoff:
+                recent += 1
+                continue
+            orphans.append((entry.path, stat.st_size))
+        return orphans, scanned, recent
+
+    def run(self, dry_run: bool = False) -> dict:
+        """Collect orphaned body files
+
+        Args:
+            dry_run: Only report what would be collected
+
+        Returns:
+            dict with 'scanned', 'orphans', 'collected', 'skipped_recent',
+            'bytes_reclaimed', 'errors'
+        """
+        orphans, scanned, recent = self.find_orphans()
+
+        collected = errors = reclaimed = 0
+        if not dry_run and orphans:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="body-gc") as pool:
+                for ok, size in pool.map(self._collect, orphans):
+                    if ok:
+                        collected += 1
+                        reclaimed += size
+                    else:
+                        errors += 1
+
+        result = {
+            'scanned': scanned,
+            'orphans': len(orphans),
+            'collected': collected,
+            'skipped_recent': recent,
+            'bytes_reclaimed': reclaimed if not dry_run else sum(size for _, size in orphans),
+            'errors': errors,
+        }
+        action = "would reclaim" if dry_run else "reclaimed"
+        print(f"[BODY-GC] {len(orphans)} orphaned of {scanned} body files, "
+              f"{action} {result['bytes_reclaimed']} bytes")
+        return result
+
+    def _collect(self, item: tuple) -> tuple:
+        path, size = item
+        try:
+            if self.archive_dir:
+                target = os.path.join(self.archive_dir, os.path.relpath(path, self.root))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(path, target)
+            else:
+                os.remove(path)
+            return True, size
+        except FileNotFoundError:
+            # Removed / migrated concurrently - nothing reclaimed
+            return True, 0
+        except OSError as e:
+            print(f"[BODY-GC] Could not collect {path}: {e}")
+            return False, 0
+
+
+if __name__ == "__main__":
+    import argparse
+    from services.storage_service import StorageService
+
+    parser = argparse.ArgumentParser(description="Remove or archive unreferenced body files")
+    parser.add_argument("--dry-run", action="store_true", help="only report orphaned files")
+    parser.add_argument("--archive", metavar="DIR", help="move orphans to DIR instead of deleting")
+    parser.add_argument("--grace-minutes", type=float, default=60,
+                        help="skip files modified in the last N minutes (default: 60)")
+    args = parser.parse_args()
+
+    gc_storage = StorageService()
+    BodyGarbageCollector(gc_storage, grace_seconds=args.grace_minutes * 60,
+                         archive_dir=args.archive).run(dry_run=args.dry_run)
@@ -0,0 +1,122 @@
+"""
+Sharded body directory layout
+Body files live in a two-level hashed tree (data/bodies/ab/cd/<message_id>.html)
+instead of one flat directory; the migrator moves old flat files in the background.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import List, Optional
+
+BODIES_DIR = "data/bodies"
+BODY_EXTENSIONS = (".html", ".txt")
+
+
+def shard_dir(message_id: str, root: str = BODIES_DIR) -> str:
+    """Directory of a message's body files, e.g. 'data/bodies/3f/a2'"""
+    digest = hashlib.sha1(message_id.encode("utf-8")).hexdigest()
+    return os.path.join(root, digest[:2], digest[2:4])
+
+
+def sharded_body_path(message_id: str, ext: str, root: str = BODIES_DIR) -> str:
+    """Body file path in the sharded layout
+
+    Args:
+        message_id: Email message ID
+        ext: File extension without dot ('html' / 'txt')
+    """
+    return os.path.join(shard_dir(message_id, root), f"{message_id}.{ext}")
+
+
+def resolve_body_path(body_file: str, root: str = BODIES_DIR) -> Optional[str]:
+    """Find a body file in either layout (stored path, sharded, flat)
+
+    Returns:
+        Existing path or None
+    """
+    if os.path.exists(body_file):
+        return body_file
+
+    name = os.path.basename(body_file)
+    message_id, ext = os.path.splitext(name)
+    for candidate in (sharded_body_path(message_id, ext.lstrip("."), root), os.path.join(root, name)):
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def list_flat_body_files(root: str = BODIES_DIR) -> List[str]:
+    """Body files still sitting directly in the bodies directory (old layout)"""
+    if not os.path.isdir(root):
+        return []
+    with os.scandir(root) as entries:
+        return [e.path for e in entries if e.is_file() and e.name.endswith(BODY_EXTENSIONS)]
+
+
+class BodyLayoutMigrator:
+    """Moves flat body files into the sharded layout on a background thread"""
+
+    def __init__(self, storage, root: str = BODIES_DIR, batch_size: int = 200, pause: float = 0.05):
+        """Initialize migrator
+
+        Args:
+            storage: StorageService (body_file references are updated through its journal)
+            root: Bodies directory
+            batch_size: Files moved between pauses / reference updates
+            pause: Sleep between batches (seconds) to stay off the UI's I/O path
+        """
+        self.storage = storage
+        self.root = root
+        self.batch_size = batch_size
+        self.pause = pause
+        self.moved = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> Optional[threading.Thread]:
+        """Start migrating if there is anything left in the flat layout"""
+        if self._thread and self._thread.is_alive():
+            return self._thread
+        if not list_flat_body_files(self.root):
+            return None
+        self._thread = threading.Thread(target=self.run, name="body-layout-migration", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """Ask the migrator to stop after the current file"""
+        self._stop.set()
+
+    def run(self) -> int:
+        """Migrate all flat files; returns number of moved files"""
+        files = list_flat_body_files(self.root)
+        print(f"[BODY-LAYOUT] Migrating {len(files)} body files to sharded layout")
+
+        updates = []
+        for path in files:
+            if self._stop.is_set():
+                break
+
+            name = os.path.basename(path)
+            message_id, ext = os.path.splitext(name)
+            target = sharded_body_path(message_id, ext.lstrip("."), self.root)
+            try:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(path, target)
+            except OSError as e:
+                print(f"[BODY-LAYOUT] Could not move {path}: {e}")
+                continue
+
+            self.moved += 1
+            updates.append((message_id, {"body_file": target.replace(os.sep, "/")}))
+            if len(updates) >= self.batch_size:
+                self.storage.update_emails_fields(updates)
+                updates = []
+                time.sleep(self.pause)
+
+        if updates:
+            self.storage.update_emails_fields(updates)
+
+        print(f"[BODY-LAYOUT] Migration finished, moved {self.moved} files")
+        return self.moved
@@ -0,0 +1,390 @@
+"""
+Content-addressed body pack store
+Stores deduplicated, zlib-compressed email bodies in append-only pack files,
+with a memory-mapped open-addressing index (sha1 digest -> pack location).
+"""
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Optional, Tuple
+
+from .body_layout import resolve_body_path
+
+# Body references stored in the CSV 'body_file' column look like
+# 'pack:<sha1 hex>.html' / 'pack:<sha1 hex>.txt'
+PACK_PREFIX = "pack:"
+
+_INDEX_MAGIC = b"SFYIDX01"
+_HEADER = struct.Struct("<8sII")         # magic, capacity, count
+_SLOT = struct.Struct("<20sIQII")        # digest, pack_no, offset, length, raw_length
+_EMPTY_DIGEST = b"\x00" * 20
+_MAX_LOAD = 0.7
+
+# One store per directory and process: each instance caches the index header and mmaps
+# the index, so a second instance would keep writing into a mapping replaced by _grow()
+_shared_stores: Dict[str, 'BodyPackStore'] = {}
+_shared_lock = threading.Lock()
+
+
+class BodyPackStore:
+    """Append-only, compressed, deduplicated body storage"""
+
+    def __init__(self, root_dir: str = "data/bodies/packs",
+                 max_pack_size: int = 64 * 1024 * 1024,
+                 initial_capacity: int = 4096,
+                 compress_level: int = 6,
+                 ref_prefix: str = PACK_PREFIX):
+        """Initialize pack store
+
+        Args:
+            root_dir: Directory holding pack files and the index
+            max_pack_size: Pack file size (bytes) after which a new pack is started
+            initial_capacity: Initial number of index slots (power of two)
+            compress_level: zlib compression level
+            ref_prefix: Prefix of the returned references (e.g. 'archive:' for cold storage)
+        """
+        self.root_dir = root_dir
+        self.ref_prefix = ref_prefix
+        self.max_pack_size = max_pack_size
+        self.compress_level = compress_level
+        self.index_path = os.path.join(root_dir, "bodies.idx")
+
+        self._lock = threading.RLock()
+        self._index_file = None
+        self._index_map: Optional[mmap.mmap] = None
+        self._capacity = 0
+        self._count = 0
+        self._pack_handles: Dict[int, object] = {}
+
+        os.makedirs(root_dir, exist_ok=True)
+        self._open_index(initial_capacity)
+        self._current_pack = self._find_current_pack()
+
+    @classmethod
+    def shared(cls, root_dir: str = "data/bodies/packs", **kwargs) -> 'BodyPackStore':
+        """The process-wide store of root_dir (created on first use, kwargs apply then)"""
+        key = os.path.abspath(root_dir)
+        with _shared_lock:
+            store = _shared_stores.get(key)
+            if store is None:
+                store = _shared_stores[key] = cls(root_dir, **kwargs)
+            return store
+
+    # ---------- Public API ----------
+
+    @staticmethod
+    def digest_of(content: str) -> str:
+        """Content hash used as the body key"""
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def is_ref(body_file: str) -> bool:
+        """Check if a body_file value points into the pack store"""
+        return bool(body_file) and body_file.startswith(PACK_PREFIX)
+
+    @staticmethod
+    def parse_ref(body_ref: str) -> Tuple[str, str]:
+        """Split 'pack:<digest>.<ext>' into (digest, ext)"""
+        name = body_ref.partition(":")[2]
+        digest, _, ext = name.partition(".")
+        return digest, ext
+
+    def put(self, content: str, ext: str = "html") -> str:
+        """Store body content (deduplicated) and return its reference
+
+        Args:
+            content: Body text
+            ext: 'html' or 'txt' - kept in the reference for format detection
+
+        Returns:
+            str: Reference like 'pack:<digest>.html'
+        """
+        raw = content.encode("utf-8")
+        digest = hashlib.sha1(raw).digest()
+
+        with self._lock:
+            if self._find_slot(digest)[1] is None:
+                data = zlib.compress(raw, self.compress_level)
+                pack_no, offset = self._append_to_pack(data)
+                self._insert(digest, pack_no, offset, len(data), len(raw))
+
+        return f"{self.ref_prefix}{digest.hex()}.{ext}"
+
+    def get(self, body_ref: str) -> Optional[str]:
+        """Load body content by reference (None if unknown)"""
+        digest_hex, _ = self.parse_ref(body_ref)
+        try:
+            digest = bytes.fromhex(digest_hex)
+        except ValueError:
+            return None
+
+        with self._lock:
+            _, entry = self._find_slot(digest)
+            if entry is None:
+                return None
+            pack_no, offset, length, _raw_length = entry
+            handle = self._pack_handle(pack_no)
+            handle.seek(offset)
+            data = handle.read(length)
+
+        return zlib.decompress(data).decode("utf-8")
+
+    def contains(self, body_ref: str) -> bool:
+        """Check if a reference resolves to stored content"""
+        try:
+            digest = bytes.fromhex(self.parse_ref(body_ref)[0])
+        except ValueError:
+            return False
+        with self._lock:
+            return self._find_slot(digest)[1] is not None
+
+    def stats(self) -> dict:
+        """Return store statistics
+
+        Returns:
+            dict with 'bodies', 'packs', 'stored_bytes', 'raw_bytes'
+        """
+        stored = raw = 0
+        with self._lock:
+            for slot in range(self._capacity):
+                digest, _pack_no, _offset, length, raw_length = self._read_slot(slot)
+                if digest != _EMPTY_DIGEST:
+                    stored += length
+                    raw += raw_length
+            packs = self._current_pack + 1 if self._count else 0
+
+        return {'bodies': self._count, 'packs': packs, 'stored_bytes': stored, 'raw_bytes': raw}
+
+    def close(self):
+        """Flush and close index and pack handles"""
+        with self._lock:
+            for handle in self._pack_handles.values():
+                handle.close()
+            self._pack_handles.clear()
+            if self._index_map is not None:
+                self._index_map.flush()
+                self._index_map.close()
+                self._index_map = None
+            if self._index_file is not None:
+                self._index_file.close()
+                self._index_file = None
+
+    # ---------- Index (open addressing, linear probing) ----------
+
+    def _open_index(self, initial_capacity: int):
+        if not os.path.exists(self.index_path):
+            self._create_index_file(self.index_path, initial_capacity)
+
+        self._index_file = open(self.index_path, "r+b")
+        self._index_map = mmap.mmap(self._index_file.fileno(), 0)
+        magic, self._capacity, self._count = _HEADER.unpack_from(self._index_map, 0)
+        if magic != _INDEX_MAGIC:
+            raise ValueError(f"Invalid body index file: {self.index_path}")
+
+    @staticmethod
+    def _create_index_file(path: str, capacity: int):
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_INDEX_MAGIC, capacity, 0))
+            f.truncate(_HEADER.size + capacity * _SLOT.size)
+
+    def _read_slot(self, slot: int) -> tuple:
+        return _SLOT.unpack_from(self._index_map, _HEADER.size + slot * _SLOT.size)
+
+    def _find_slot(self, digest: bytes) -> Tuple[int, Optional[tuple]]:
+        """Return (slot, (pack_no, offset, length, raw_length)) or (free_slot, None)"""
+        slot = int.from_bytes(digest[:8], "little") & (self._capacity - 1)
+        while True:
+            stored, pack_no, offset, length, raw_length = self._read_slot(slot)
+            if stored == _EMPTY_DIGEST:
+                return slot, None
+            if stored == digest:
+                return slot, (pack_no, offset, length, raw_length)
+            slot = (slot + 1) & (self._capacity - 1)
+
+    def _insert(self, digest: bytes, pack_no: int, offset: int, length: int, raw_length: int):
+        if (self._count + 1) > self._capacity * _MAX_LOAD:
+            self._grow()
+
+        slot, _ = self._find_slot(digest)
+        _SLOT.pack_into(self._index_map, _HEADER.size + slot * _SLOT.size,
+                        digest, pack_no, offset, length, raw_length)
+        self._count += 1
+        _HEADER.pack_into(self._index_map, 0, _INDEX_MAGIC, self._capacity, self._count)
+        self._index_map.flush()
+
+    def _grow(self):
+        """Rebuild the index with double capacity and swap it in atomically"""
+        entries = [self._read_slot(s) for s in range(self._capacity)]
+        entries = [e for e in entries if e[0] != _EMPTY_DIGEST]
+
+        new_capacity = self._capacity * 2
+        tmp_path = self.index_path + ".tmp"
+        self._create_index_file(tmp_path, new_capacity)
+
+        with open(tmp_path, "r+b") as f:
+            new_map = mmap.mmap(f.fileno(), 0)
+            for digest, pack_no, offset, length, raw_length in entries:
+                slot = int.from_bytes(digest[:8], "little") & (new_capacity - 1)
+                while _SLOT.unpack_from(new_map, _HEADER.size + slot * _SLOT.size)[0] != _EMPTY_DIGEST:
+                    slot = (slot + 1) & (new_capacity - 1)
+                _SLOT.pack_into(new_map, _HEADER.size + slot * _SLOT.size,
+                                digest, pack_no, offset, length, raw_length)
+            _HEADER.pack_into(new_map, 0, _INDEX_MAGIC, new_capacity, len(entries))
+            new_map.flush()
+            new_map.close()
+
+        self._index_map.close()
+        self._index_file.close()
+        os.replace(tmp_path, self.index_path)
+        self._open_index(new_capacity)
+
+    # ---------- Pack files ----------
+
+    def _pack_path(self, pack_no: int) -> str:
+        return os.path.join(self.root_dir, f"pack-{pack_no:05d}.pack")
+
+    def _find_current_pack(self) -> int:
+        pack_no = 0
+        while os.path.exists(self._pack_path(pack_no + 1)):
+            pack_no += 1
+        return pack_no
+
+    def _pack_handle(self, pack_no: int):
+        handle = self._pack_handles.get(pack_no)
+        if handle is None:
+            handle = open(self._pack_path(pack_no), "a+b")
+            self._pack_handles[pack_no] = handle
+        return handle
+
+    def _append_to_pack(self, data: bytes) -> Tuple[int, int]:
+        path = self._pack_path(self._current_pack)
+        if os.path.exists(path) and os.path.getsize(path) + len(data) > self.max_pack_size:
+            self._current_pack += 1
+
+        handle = self._pack_handle(self._current_pack)
+        handle.seek(0, os.SEEK_END)
+        offset = handle.tell()
+        handle.write(data)
+        handle.flush()
+        # On disk before the index slot pointing at it is written
+        os.fsync(handle.fileno())
+        return self._current_pack, offset
+
+
+def _is_store_ref(body_ref: str) -> bool:
+    """'<prefix>:<sha1 hex>.<ext>' reference of a pack store (body pack or archive segments)"""
+    prefix, sep, name = body_ref.partition(":")
+    return bool(sep) and prefix.isalpha() and len(name.partition(".")[0]) == 40
+
+
+def migrate_body_directory(storage, bodies_dir: str = "data/bodies",
+                           delete_files: bool = False) -> dict:
+    """Move flat body files into the pack store and rewrite CSV references
+
+    Args:
+        storage: StorageService instance (must use the 'pack' body backend)
+        bodies_dir: Directory containing '<message_id>.html' / '.txt' files
+        delete_files: Remove the original files after a successful migration
+
+    Returns:
+        dict with 'migrated', 'missing', 'saved' (CSV rewritten), 'bytes_before', 'bytes_after'
+    """
+    pack = storage.body_pack
+    if pack is None:
+        raise ValueError("Storage is not configured with the 'pack' body backend")
+    if storage.is_test_mode():
+        raise ValueError("Body migration is not available in test mode (the CSV is not saved)")
+
+    emails = storage.load_emails()
+    migrated = missing = bytes_before = 0
+    moved_files = []
+
+    to_migrate = []
+    for email in emails:
+        body_file = email.get("body_file", "")
+        if not body_file or BodyPackStore.is_ref(body_file):
+            continue
+
+        path = resolve_body_path(body_file, bodies_dir)
+        if path is None:
+            missing += 1
+            continue
+        to_migrate.append((email, path))
+
+    # Files are read in parallel (order preserved), packing stays sequential
+    contents = storage.load_bodies([path for _, path in to_migrate])
+
+    for (email, body_file), (body_html, body_plain) in zip(to_migrate, contents):
+        content = body_html or body_plain
+        ext = "html" if body_file.endswith(".html") else "txt"
+        old_ref = email.get("body_file", "")
+        email["body_file"] = pack.put(content, ext)
+        if email.get("text_file") == old_ref:
+            # Plain-text bodies are their own text
+            email["text_file"] = email["body_file"]
+        bytes_before += os.path.getsize(body_file)
+        moved_files.append(body_file)
+        migrated += 1
+
+    # Text sidecars of HTML bodies ('.text') move into the pack store as well
+    for email in emails:
+        text_file = email.get("text_file", "")
+        if not text_file or _is_store_ref(text_file):
+            continue
+        path = resolve_body_path(text_file, bodies_dir)
+        if path is None:
+            continue
+        text = storage.load_body_from_file_raw(path, cached=False)[1]
+        email["text_file"] = pack.put(text, "text") if text else ""
+        bytes_before += os.path.getsize(path)
+        moved_files.append(path)
+
+    saved = storage.save_emails(emails)
+    if not saved and moved_files:
+        # The CSV still points at the flat files - keep them
+        print("[BODY-PACK] CSV could not be saved - original body files were kept")
+
+    if delete_files and saved:
+        # Never delete a file the saved CSV still references
+        referenced = set()
+        for email in emails:
+            for ref in (email.get("body_file", ""), email.get("text_file", "")):
+                if ref and not _is_store_ref(ref):
+                    path = resolve_body_path(ref, bodies_dir)
+                    if path is not None:
+                        referenced.add(os.path.abspath(path))
+        for path in moved_files:
+            if os.path.abspath(path) in referenced:
+                continue
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"[BODY-PACK] Could not remove {path}: {e}")
+
+    result = {
+        'migrated': migrated,
+        'missing': missing,
+        'saved': saved,
+        'bytes_before': bytes_before,
+        'bytes_after': pack.stats()['stored_bytes'],
+    }
+    print(f"[BODY-PACK] Migration finished: {result}")
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    from services.storage_service import StorageService
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("migrate", "stats"):
+        print("Usage: python -m services.body_store migrate [--delete] | stats")
+        sys.exit(1)
+
+    store_storage = StorageService(body_backend="pack")
+    if sys.argv[1] == "migrate":
+        migrate_body_directory(store_storage, delete_files="--delete" in sys.argv)
+    else:
+        print(store_storage.body_pack.stats())
@@ -8,6 +8,8 @@ from google import genai
 from google.genai import errors
 from google.genai.errors import ServerError
 
+from utils import email_body_text
+
 
 class GeminiService:
     def __init__(self, api_key: Optional[str] = None, model: str = "gemini-2.0-flash-exp"):
@@ -172,7 +174,7 @@ Email szövege:
         """Generate summaries for multiple emails
         
         Args:
-            emails: List of email dicts with 'message_id', 'subject', 'body_plain', 'sender_name'
+            emails: List of email dicts with 'message_id', 'subject', 'body_text', 'sender_name'
             max_retries: Maximum retry attempts per email
             
         Returns:
@@ -184,16 +186,9 @@ Email szövege:
             message_id = email.get('message_id', '')
             subject = email.get('subject', '(no subject)')
             
-            # Use body_plain, or fallback to stripped body_html
-            body_plain = email.get('body_plain', '')
-            if not body_plain:
-                # Fallback: load and strip HTML if only HTML available
-                body_html = email.get('body_html', '')
-                if body_html:
-                    # Simple HTML stripping (basic, Gemini can handle some HTML)
-                    import re
-                    body_plain = re.sub(r'<[^>]+>', '', body_html)
-            
+            # Plain text extracted once at ingest
+            body_plain = email_body_text(email)
+
             sender = email.get('sender_name', '')
             
             # Skip if already has summary
@@ -231,6 +231,7 @@ class GmailService:
                 'body_plain': body_data.get('plain', ''),
                 'body_html': body_data.get('html', ''),
                 'tag': tag_internal,
+                'gmail_labels': [label_map.get(lid, lid) for lid in label_ids],
                 'is_last_downloaded': 1
             }
 
@@ -267,6 +268,26 @@ class GmailService:
         if not self.service:
             return
 
+        add_ids, remove_ids = self._sortify_label_change(new_internal_tag)
+
+        body = {
+            "addLabelIds": add_ids,
+            "removeLabelIds": remove_ids,
+        }
+
+        try:
+            self.service.users().messages().modify(
+                userId="me",
+                id=message_id,
+                body=body
+            ).execute()
+            print(f"[GMAIL] Labels updated for {message_id}: add={add_ids}, remove={remove_ids}")
+        except Exception as e:
+            print(f"[GMAIL] Failed to update labels for {message_id}: {e}")
+
+
+    def _sortify_label_change(self, new_internal_tag: str):
+        """(addLabelIds, removeLabelIds) that set the Sortify label of a message to new_internal_tag"""
         # 1) Label ID → név cache már van: get_label_map()
         label_map = self.get_label_map()              # id -> name
         name_to_id = {v: k for k, v in label_map.items()}  # név -> id
@@ -310,21 +331,32 @@ class GmailService:
         else:
             remove_ids = sortify_label_ids
 
-        body = {
-            "addLabelIds": add_ids,
-            "removeLabelIds": remove_ids,
-        }
+        return add_ids, remove_ids
 
-        try:
-            self.service.users().messages().modify(
-                userId="me",
-                id=message_id,
-                body=body
-            ).execute()
-            print(f"[GMAIL] Labels updated for {message_id}: add={add_ids}, remove={remove_ids}")
-        except Exception as e:
-            print(f"[GMAIL] Failed to update labels for {message_id}: {e}")
+    def set_messages_label(self, message_ids, new_internal_tag: str) -> int:
+        """Set the Sortify label of many messages (batchModify, max 1000 ids per call)
 
+        Returns:
+            int: Number of messages updated
+        """
+        if not self.service or not message_ids:
+            return 0
+
+        add_ids, remove_ids = self._sortify_label_change(new_internal_tag)
+        message_ids = list(message_ids)
+        updated = 0
+        for start in range(0, len(message_ids), 1000):
+            chunk = message_ids[start:start + 1000]
+            try:
+                self.service.users().messages().batchModify(
+                    userId="me",
+                    body={"ids": chunk, "addLabelIds": add_ids, "removeLabelIds": remove_ids}
+                ).execute()
+                updated += len(chunk)
+            except Exception as e:
+                print(f"[GMAIL] Failed to update labels for {len(chunk)} messages: {e}")
+        print(f"[GMAIL] Labels updated for {updated} messages: add={add_ids}, remove={remove_ids}")
+        return updated
 
     def get_label_map(self):
         """Get all Gmail labels (cached) - ADDED from branch1"""
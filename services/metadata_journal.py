@@ -0,0 +1,123 @@
+"""
+Write-ahead journal for email metadata changes
+Tag / AI summary / flag edits are appended as JSON lines and replayed on load,
+so interactive edits never rewrite the whole CSV snapshot.
+"""
+import json
+import os
+import threading
+from typing import Dict, Iterable, Tuple
+
+# Fields that may be changed through the journal (everything else comes from Gmail sync);
+# body_file changes when the layout migrator moves a body file
+JOURNALED_FIELDS = {"tag", "ai_summary", "needs_more_info", "is_last_downloaded", "rule_applied", "body_file"}
+
+
+class MetadataJournal:
+    """Append-only JSON-lines journal of per-message field updates"""
+
+    def __init__(self, path: str, fsync: bool = True):
+        """Initialize journal
+
+        Args:
+            path: Journal file path (e.g. 'data/emails.csv.journal')
+            fsync: fsync after every append (crash safety)
+        """
+        self.path = path
+        self.compacting_path = path + ".compacting"
+        self.fsync = fsync
+        self._lock = threading.Lock()
+
+    def append(self, message_id: str, fields: Dict) -> None:
+        """Append a single update record"""
+        self.append_many([(message_id, fields)])
+
+    def append_many(self, updates: Iterable[Tuple[str, Dict]]) -> int:
+        """Append several update records with one write
+
+        Args:
+            updates: Iterable of (message_id, {field: value}) pairs
+
+        Returns:
+            int: Number of records written
+        """
+        lines = []
+        for message_id, fields in updates:
+            clean = {k: v for k, v in fields.items() if k in JOURNALED_FIELDS}
+            if message_id and clean:
+                lines.append(json.dumps({"id": message_id, "set": clean}, ensure_ascii=False))
+
+        if not lines:
+            return 0
+
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+
+        with self._lock:
+            with open(self.path, "a+b") as f:
+                # Terminate a half-written line left behind by a crash
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        data = b"\n" + data
+                f.write(data)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+        return len(lines)
+
+    def replay(self) -> Dict[str, Dict]:
+        """Fold the journal into {message_id: {field: value}} (last write wins)
+
+        A half-written trailing line (crash during append) is ignored.
+        """
+        state: Dict[str, Dict] = {}
+        for path in (self.compacting_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    state.setdefault(record.get("id"), {}).update(record.get("set", {}))
+        state.pop(None, None)
+        return state
+
+    def size(self) -> int:
+        """Current journal size in bytes"""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def begin_compaction(self) -> bool:
+        """Freeze the current journal for folding; new appends go to a fresh file
+
+        Returns:
+            bool: True if there is anything to compact
+        """
+        with self._lock:
+            if os.path.exists(self.compacting_path):
+                # Leftover from an interrupted compaction - fold it first
+                return True
+            if not os.path.exists(self.path):
+                return False
+            os.replace(self.path, self.compacting_path)
+            return True
+
+    def finish_compaction(self) -> None:
+        """Drop the frozen journal after it was folded into the snapshot"""
+        try:
+            os.remove(self.compacting_path)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """Remove all journal files (after a full snapshot write)"""
+        with self._lock:
+            for path in (self.path, self.compacting_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
@@ -0,0 +1,303 @@
+"""
+Streaming NDJSON export / import of the mailbox store
+One email per line (metadata + embedded or referenced body), optionally gzip
+compressed. Both directions run in constant memory and resume from a checkpoint
+sidecar ('<file>.ckpt') after an interruption.
+"""
+import csv
+import gzip
+import itertools
+import json
+import os
+from typing import Dict, Iterator, Optional
+
+from models.email_model import EmailRecord
+from utils import apply_sender_info, html_to_text
+from .startup_snapshot import file_signature
+
+BODY_MODES = ("embed", "ref", "none")
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def _is_gzip(path: str) -> bool:
+    if path.endswith(".gz"):
+        return True
+    try:
+        with open(path, "rb") as f:
+            return f.read(2) == _GZIP_MAGIC
+    except OSError:
+        return False
+
+
+def _read_checkpoint(path: str) -> Optional[Dict]:
+    try:
+        with open(path + ".ckpt", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_checkpoint(path: str, state: Dict) -> None:
+    tmp_path = path + ".ckpt.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path + ".ckpt")
+
+
+def _clear_checkpoint(path: str) -> None:
+    try:
+        os.remove(path + ".ckpt")
+    except OSError:
+        pass
+
+
+def email_to_json(email: Dict) -> Dict:
+    """Metadata of an email as a JSON-ready dict (lists stay lists)"""
+    record = EmailRecord.from_mapping(email)
+    obj = {}
+    for name in EmailRecord.FIELDS:
+        value = getattr(record, name)
+        obj[name] = list(value) if isinstance(value, tuple) else value
+    return obj
+
+
+def export_ndjson(storage, out_path: str, bodies: str = "embed", compress: Optional[bool] = None,
+                  include_archived: bool = False, batch_size: int = 500, resume: bool = True) -> int:
+    """Export stored emails as NDJSON
+
+    Lines are written in batches; every batch is its own gzip member when
+    compressing, and the checkpoint records the file offset after each batch,
+    so an interrupted export continues where it stopped.
+
+    Args:
+        storage: StorageService
+        out_path: Output file ('.gz' suffix turns on compression by default)
+        bodies: 'embed' (body_html / body_plain inline), 'ref' (body_file only) or 'none'
+        compress: gzip output (default: by file suffix)
+        include_archived: Also export the archive tier
+        batch_size: Emails per batch / checkpoint
+        resume: Continue from an existing checkpoint
+
+    Returns:
+        int: Number of exported emails (total, including resumed part)
+    """
+    if bodies not in BODY_MODES:
+        raise ValueError(f"bodies must be one of {', '.join(BODY_MODES)}")
+    if compress is None:
+        compress = out_path.endswith(".gz")
+
+    checkpoint = _read_checkpoint(out_path) if resume else None
+    done = checkpoint["emails"] if checkpoint else 0
+    offset = checkpoint["offset"] if checkpoint else 0
+
+    emails = storage.iter_emails()
+    if include_archived:
+        emails = itertools.chain(emails, storage.iter_archived())
+    emails = itertools.islice(emails, done, None)
+
+    with open(out_path, "r+b" if checkpoint and os.path.exists(out_path) else "wb") as f:
+        # Drop whatever a crashed run wrote after the last checkpoint
+        f.seek(offset)
+        f.truncate()
+
+        for batch in _batches(_export_lines(storage, emails, bodies), batch_size):
+            data = "".join(batch).encode("utf-8")
+            f.write(gzip.compress(data) if compress else data)
+            f.flush()
+            os.fsync(f.fileno())
+            done += len(batch)
+            _write_checkpoint(out_path, {"emails": done, "offset": f.tell()})
+
+    _clear_checkpoint(out_path)
+    print(f"[NDJSON] Exported {done} emails to {out_path}")
+    return done
+
+
+def _export_lines(storage, emails, bodies: str) -> Iterator[str]:
+    if bodies == "embed":
+        for email, body_html, body_plain in storage.iter_with_bodies(emails):
+            obj = email_to_json(email)
+            obj["body_html"] = body_html
+            obj["body_plain"] = body_plain
+            yield json.dumps(obj, ensure_ascii=False) + "\n"
+    else:
+        for email in emails:
+            obj = email_to_json(email)
+            if bodies == "none":
+                obj["body_file"] = obj["text_file"] = ""
+            yield json.dumps(obj, ensure_ascii=False) + "\n"
+
+
+def _csv_header(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return next(csv.reader(f), [])
+
+
+def _batches(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def import_ndjson(storage, in_path: str, batch_size: int = 500, resume: bool = True) -> int:
+    """Import NDJSON emails into the working CSV (streaming append)
+
+    Emails whose message_id is already stored are skipped. Embedded bodies are
+    written through the configured body backend; referenced bodies are kept as-is.
+
+    The import claims the data directory (StorageService.acquire_store_lock): while
+    the app runs it would overwrite the appended rows with its next save.
+
+    Args:
+        storage: StorageService (must not be in test mode)
+        in_path: NDJSON file (plain or gzip)
+        batch_size: Emails per CSV append / checkpoint
+        resume: Continue from an existing checkpoint
+
+    Returns:
+        int: Number of imported emails (this run)
+    """
+    if storage.is_test_mode():
+        raise RuntimeError("Test mode - import would overwrite test data")
+    if not storage.acquire_store_lock():
+        raise RuntimeError("The mailbox is in use (Sortify is running?) - close it before importing")
+    try:
+        return _import_locked(storage, in_path, batch_size, resume)
+    finally:
+        storage.release_store_lock()
+
+
+def _import_locked(storage, in_path: str, batch_size: int, resume: bool) -> int:
+    checkpoint = _read_checkpoint(in_path) if resume else None
+    consumed = checkpoint["lines"] if checkpoint else 0
+
+    csv_path = storage.csv_path
+    if checkpoint and file_signature(csv_path) != tuple(checkpoint.get("csv_sig") or ()):
+        # The CSV changed since the checkpoint: an interrupted batch append, or a rewrite
+        # (compaction, archiving, a save) - its size is no longer a safe cut-off point.
+        # Start over; rows already imported are skipped by message_id.
+        _drop_partial_row(csv_path, checkpoint.get("csv_sig"))
+        print(f"[NDJSON] {csv_path} changed since the checkpoint - restarting the import")
+        consumed = 0
+
+    # Fold the journal first and bring an older CSV layout up to the current columns,
+    # so rows can simply be appended
+    storage.compact_journal()
+    if os.path.exists(csv_path) and _csv_header(csv_path) != storage.CSV_FIELDNAMES:
+        storage.save_emails(list(storage.iter_emails()))
+    known = {e["message_id"] for e in storage.iter_emails(fields=("message_id",))}
+    new_file = not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0
+
+    opener = gzip.open if _is_gzip(in_path) else open
+    imported = 0
+    with opener(in_path, "rt", encoding="utf-8") as src:
+        lines = itertools.islice(src, consumed, None)
+        for batch in _batches(lines, batch_size):
+            rows, search_docs = [], []
+            for line in batch:
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                msg_id = obj.get("message_id")
+                if not msg_id or msg_id in known:
+                    continue
+                known.add(msg_id)
+                record, body_text = _import_record(storage, obj)
+                rows.append(storage.email_to_row(record))
+                search_docs.append({
+                    "message_id": msg_id,
+                    "subject": record.subject,
+                    "sender": record.sender,
+                    "sender_name": record.sender_name,
+                    "body_text": body_text,
+                })
+
+            with storage.exclusive(), open(csv_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=storage.CSV_FIELDNAMES)
+                if new_file:
+                    writer.writeheader()
+                    new_file = False
+                writer.writerows(rows)
+                f.flush()
+                os.fsync(f.fileno())
+
+            storage.search_index.index_emails(search_docs)
+            consumed += len(batch)
+            imported += len(rows)
+            _write_checkpoint(in_path, {"lines": consumed, "csv_sig": file_signature(csv_path)})
+
+    _clear_checkpoint(in_path)
+    print(f"[NDJSON] Imported {imported} emails from {in_path}")
+    return imported
+
+
+def _drop_partial_row(csv_path: str, checkpoint_sig) -> None:
+    """Cut a row half-written by an interrupted append back to the checkpointed size
+
+    Every complete write (append or rewrite) ends with a newline, so a CSV ending
+    mid-line was only appended to since the checkpoint.
+    """
+    if not checkpoint_sig or not os.path.exists(csv_path):
+        return
+    size = checkpoint_sig[1]
+    with open(csv_path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        if end <= size:
+            return
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.truncate(size)
+
+
+def _import_record(storage, obj: Dict) -> tuple:
+    """Build a record from an NDJSON object, storing embedded bodies
+
+    Returns:
+        (EmailRecord, body_text)
+    """
+    body_html = obj.pop("body_html", None)
+    body_plain = obj.pop("body_plain", None)
+    record = EmailRecord({k: v for k, v in obj.items() if k in EmailRecord.FIELDS})
+    if not record.sender_address:
+        apply_sender_info(record)
+
+    if body_html is None and body_plain is None:
+        # Referenced body (or none) - text is read lazily from the reference
+        return record, record.get("body_text", "")
+
+    body_text = body_plain if (body_plain or "").strip() else html_to_text(body_html or "")
+    body_file, body_format = storage.save_body_to_file(record.message_id, body_plain or "", body_html or "")
+    record["body_file"] = body_file
+    record["body_format"] = body_format
+    record["text_file"] = storage.save_text_body(record.message_id, body_text, body_file, body_format)
+    return record, body_text
+
+
+if __name__ == "__main__":
+    import argparse
+    from services.storage_service import StorageService
+
+    parser = argparse.ArgumentParser(description="NDJSON export / import of the mailbox store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="write all emails to an NDJSON file")
+    p_export.add_argument("path", help="output file ('.gz' = compressed)")
+    p_export.add_argument("--bodies", choices=BODY_MODES, default="embed")
+    p_export.add_argument("--archived", action="store_true", help="include the archive tier")
+    p_export.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+
+    p_import = sub.add_parser("import", help="append emails from an NDJSON file")
+    p_import.add_argument("path", help="input file (plain or gzip)")
+    p_import.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+
+    args = parser.parse_args()
+    ndjson_storage = StorageService()
+    if args.command == "export":
+        export_ndjson(ndjson_storage, args.path, bodies=args.bodies,
+                      include_archived=args.archived, resume=not args.restart)
+    else:
+        import_ndjson(ndjson_storage, args.path, resume=not args.restart)
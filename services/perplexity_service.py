@@ -9,6 +9,8 @@ import sys
 from typing import Optional
 from perplexity import Perplexity
 
+from utils import email_body_text
+
 class PerplexityService:
     def __init__(self, api_key: Optional[str] = None, model: str = "sonar"):
         """Initialize Perplexity client
@@ -150,7 +152,7 @@ Email szövege:
         """Generate summaries for multiple emails
 
         Args:
-            emails: List of email dicts with 'message_id', 'subject', 'body_plain', 'sender_name'
+            emails: List of email dicts with 'message_id', 'subject', 'body_text', 'sender_name'
             max_retries: Maximum retry attempts per email
 
         Returns:
@@ -162,15 +164,8 @@ Email szövege:
             message_id = email.get('message_id', '')
             subject = email.get('subject', '(no subject)')
 
-            # Use body_plain, or fallback to stripped body_html
-            body_plain = email.get('body_plain', '')
-            if not body_plain:
-                # Fallback: load and strip HTML if only HTML available
-                body_html = email.get('body_html', '')
-                if body_html:
-                    # Simple HTML stripping
-                    import re
-                    body_plain = re.sub(r'<[^>]+>', '', body_html)
+            # Plain text extracted once at ingest
+            body_plain = email_body_text(email)
 
             sender = email.get('sender_name', '')
 
@@ -0,0 +1,134 @@
+"""
+Full-text search index over subject, sender and body text
+SQLite FTS5 table with accent folding (unicode61 remove_diacritics 2), so
+'beadando' finds 'beadandó' and 'hataridő' finds 'határidő'.
+"""
+import re
+import sqlite3
+import threading
+from typing import Dict, Iterable, List
+
+from utils import email_body_text
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class SearchIndex:
+    """Incrementally updated FTS5 index of stored emails"""
+
+    def __init__(self, db_path: str = "data/search.db"):
+        """Initialize search index
+
+        Args:
+            db_path: SQLite database file
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.available = self._create_schema()
+
+    def _create_schema(self) -> bool:
+        try:
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS docs ("
+                    " message_id TEXT PRIMARY KEY,"
+                    " doc_id INTEGER NOT NULL)"
+                )
+                # search() joins FTS hits back by doc_id - without this every hit scans docs
+                self._conn.execute("CREATE INDEX IF NOT EXISTS docs_doc_id ON docs(doc_id)")
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS email_fts USING fts5("
+                    " subject, sender, body,"
+                    " tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            return True
+        except sqlite3.OperationalError as e:
+            print(f"[SEARCH] FTS5 not available, search disabled: {e}")
+            return False
+
+    def index_emails(self, emails: Iterable[Dict]) -> int:
+        """Add or replace emails in the index (single transaction)
+
+        Args:
+            emails: Email dicts with 'message_id', 'subject', 'sender', 'sender_name' and 'body_text'
+
+        Returns:
+            int: Number of indexed emails
+        """
+        if not self.available:
+            return 0
+
+        count = 0
+        with self._lock, self._conn:
+            for email in emails:
+                msg_id = email.get("message_id")
+                if not msg_id:
+                    continue
+
+                row = self._conn.execute("SELECT doc_id FROM docs WHERE message_id = ?", (msg_id,)).fetchone()
+                if row:
+                    self._conn.execute("DELETE FROM email_fts WHERE rowid = ?", (row[0],))
+
+                sender = f"{email.get('sender_name', '')} {email.get('sender', '')}"
+                cur = self._conn.execute(
+                    "INSERT INTO email_fts (subject, sender, body) VALUES (?, ?, ?)",
+                    (email.get("subject", ""), sender, email_body_text(email)),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO docs (message_id, doc_id) VALUES (?, ?)",
+                    (msg_id, cur.lastrowid),
+                )
+                count += 1
+        return count
+
+    def remove(self, message_ids: Iterable[str]) -> None:
+        """Remove emails from the index"""
+        if not self.available:
+            return
+        with self._lock, self._conn:
+            for msg_id in message_ids:
+                row = self._conn.execute("SELECT doc_id FROM docs WHERE message_id = ?", (msg_id,)).fetchone()
+                if row:
+                    self._conn.execute("DELETE FROM email_fts WHERE rowid = ?", (row[0],))
+                    self._conn.execute("DELETE FROM docs WHERE message_id = ?", (msg_id,))
+
+    def indexed_ids(self) -> set:
+        """Message IDs currently present in the index"""
+        if not self.available:
+            return set()
+        with self._lock:
+            return {r[0] for r in self._conn.execute("SELECT message_id FROM docs")}
+
+    @staticmethod
+    def build_query(text: str) -> str:
+        """Turn free text into an FTS5 query: every word must match (prefix match)"""
+        words = _WORD_RE.findall(text)
+        return " ".join(f'"{w}"*' for w in words)
+
+    def search(self, text: str, limit: int = 1000) -> List[str]:
+        """Search subject, sender and body text
+
+        Args:
+            text: Free text query (accents optional)
+            limit: Maximum number of hits
+
+        Returns:
+            List of message IDs, best match first
+        """
+        query = self.build_query(text)
+        if not query or not self.available:
+            return []
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.message_id FROM email_fts f JOIN docs d ON d.doc_id = f.rowid"
+                " WHERE email_fts MATCH ? ORDER BY bm25(email_fts, 5.0, 3.0, 1.0) LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
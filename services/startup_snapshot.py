@@ -0,0 +1,112 @@
+"""
+Binary startup snapshot
+Versioned pickle of the ready-to-display email table (records sorted by date,
+rules already applied), so launch does not re-parse the CSV. Valid only while
+the CSV it was built from is unchanged; journal edits are replayed on top.
+"""
+import os
+import pickle
+import threading
+from typing import List, Optional, Tuple
+
+from models.email_model import EmailRecord
+
+SNAPSHOT_VERSION = 1
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, None if missing"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class StartupSnapshot:
+    """Pickled email table tied to the CSV snapshot it mirrors"""
+
+    def __init__(self, path: str):
+        """Initialize snapshot
+
+        Args:
+            path: Snapshot file (e.g. 'data/emails.snapshot')
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    def save(self, emails: List[EmailRecord], csv_path: str, rules_sig=None,
+             expected_csv_sig: Optional[Tuple[int, int]] = None) -> bool:
+        """Write the snapshot atomically
+
+        Args:
+            emails: Records as they were just written to / loaded from csv_path
+            csv_path: CSV the records mirror (its signature decides freshness)
+            rules_sig: Signature of the rule set applied to the records (None = not applied)
+            expected_csv_sig: Signature of csv_path when the records were loaded; if the CSV
+                changed since, the records are outdated and nothing is written
+
+        Returns:
+            bool: True if written
+        """
+        with self._lock:
+            csv_sig = file_signature(csv_path)
+            if csv_sig is None or (expected_csv_sig is not None and csv_sig != expected_csv_sig):
+                return False
+            return self._write(emails, csv_sig, rules_sig)
+
+    def _write(self, emails: List[EmailRecord], csv_sig: Tuple[int, int], rules_sig) -> bool:
+
+        records = sorted((EmailRecord.from_mapping(e) for e in emails),
+                         key=lambda e: e.datetime, reverse=True)
+        payload = {
+            "version": SNAPSHOT_VERSION,
+            "fields": EmailRecord.FIELDS,
+            "csv_sig": csv_sig,
+            "rules_sig": rules_sig,
+            "records": [e.__getstate__() for e in records],
+        }
+
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+            return True
+        except Exception as e:
+            print(f"[SNAPSHOT] Could not write {self.path}: {e}")
+            return False
+
+    def load(self, csv_path: str) -> Optional[Tuple[List[EmailRecord], object]]:
+        """Load the snapshot if it still mirrors csv_path
+
+        Returns:
+            (records sorted newest first, rules_sig) or None if missing / stale / other version
+        """
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "rb") as f:
+                payload = pickle.load(f)
+        except Exception as e:
+            print(f"[SNAPSHOT] Could not read {self.path}: {e}")
+            return None
+
+        if (payload.get("version") != SNAPSHOT_VERSION
+                or payload.get("fields") != EmailRecord.FIELDS
+                or payload.get("csv_sig") != file_signature(csv_path)):
+            return None
+
+        records = []
+        for state in payload["records"]:
+            record = EmailRecord.__new__(EmailRecord)
+            record.__setstate__(state)
+            records.append(record)
+        return records, payload.get("rules_sig")
+
+    def invalidate(self) -> None:
+        """Remove the snapshot file"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,87 @@
+"""
+Storage profile
+Which data set (production CSV or read-only test CSV) the storage works on is
+resolved once into a StorageProfile; an optional watcher re-resolves it when the
+test file appears or disappears at runtime.
+"""
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """Resolved storage mode and the paths that belong to it"""
+
+    name: str          # 'production' or 'test'
+    csv_path: str
+    read_only: bool    # test data set must never be overwritten
+
+    @property
+    def is_test(self) -> bool:
+        return self.name == "test"
+
+    @property
+    def journal_path(self) -> str:
+        return self.csv_path + ".journal"
+
+    @property
+    def search_db_path(self) -> str:
+        return os.path.splitext(self.csv_path)[0] + ".search.db"
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.splitext(self.csv_path)[0] + ".snapshot"
+
+    @property
+    def archive_csv_path(self) -> str:
+        return os.path.splitext(self.csv_path)[0] + ".archive.csv"
+
+    @classmethod
+    def resolve(cls, default_csv_path: str, test_csv_path: str) -> 'StorageProfile':
+        """Pick the test profile if the test CSV exists, otherwise production"""
+        if os.path.exists(test_csv_path):
+            return cls("test", test_csv_path, read_only=True)
+        return cls("production", default_csv_path, read_only=False)
+
+
+class ProfileWatcher:
+    """Polls for the test CSV and reports profile switches (daemon thread)"""
+
+    def __init__(self, default_csv_path: str, test_csv_path: str,
+                 on_change: Callable[[StorageProfile], None], interval: float = 2.0):
+        """Initialize watcher
+
+        Args:
+            default_csv_path: Production CSV path
+            test_csv_path: Test CSV path whose presence switches to test mode
+            on_change: Called with the new profile (from the watcher thread)
+            interval: Poll interval in seconds
+        """
+        self.default_csv_path = default_csv_path
+        self.test_csv_path = test_csv_path
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, current: StorageProfile) -> None:
+        """Start watching, starting from the given profile"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(current,),
+                                        name="storage-profile-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop watching"""
+        self._stop.set()
+
+    def _run(self, current: StorageProfile) -> None:
+        while not self._stop.wait(self.interval):
+            profile = StorageProfile.resolve(self.default_csv_path, self.test_csv_path)
+            if profile != current:
+                current = profile
+                self.on_change(profile)
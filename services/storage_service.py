@@ -1,11 +1,36 @@
 import csv
 import os
-import re
-from typing import List, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator
+
+from models.email_model import EmailRecord
+from utils.config_helper import get_config_value
+from utils.html_utils import html_to_text
+from utils.sender_utils import apply_sender_info
+from .archive_service import ARCHIVE_PREFIX, ARCHIVE_SEGMENTS_DIR
+from .body_cache import BodyCache
+from .body_layout import BodyLayoutMigrator, resolve_body_path, sharded_body_path
+from .body_store import BodyPackStore
+from .metadata_journal import MetadataJournal
+from .search_index import SearchIndex
+from .startup_snapshot import StartupSnapshot, file_signature
+from .storage_profile import ProfileWatcher, StorageProfile
+
+# Held by the process that owns the data directory (see acquire_store_lock)
+STORE_LOCK_PATH = "data/store.lock"
 
 
 class StorageService:
-    def __init__(self, csv_path: str = "data/emails.csv"):
+    CSV_FIELDNAMES = [
+        "message_id", "sender", "sender_name", "sender_domain",
+        "subject", "datetime", "attachment_count", "attachment_names",
+        "mime_types", "tag", "is_last_downloaded", "needs_more_info",
+        "rule_applied", "body_file", "body_format", "ai_summary", "text_file",
+        "sender_address", "sender_reg_domain"
+    ]
+
+    def __init__(self, csv_path: str = "data/emails.csv", body_backend: Optional[str] = None):
         self.default_csv_path = csv_path
         self.test_csv_path = "data/emails_mod.csv"
 
@@ -13,23 +38,116 @@ class StorageService:
         os.makedirs("data", exist_ok=True)
         os.makedirs("data/bodies", exist_ok=True)
 
-        self._update_mode()
+        # Body backend: 'files' (one file per message) or 'pack' (compressed pack store)
+        if body_backend is None:
+            body_backend = get_config_value('storage', 'body_backend', fallback='files')
+        self.body_backend = body_backend.strip().lower()
+        self.body_pack = BodyPackStore.shared() if self.body_backend == 'pack' else None
 
-    def _update_mode(self):
-        """Check if test mode is active and set the appropriate CSV path"""
-        if os.path.exists(self.test_csv_path):
-            self.csv_path = self.test_csv_path
+        # Metadata journal: fold into the CSV snapshot once it grows past this size
+        self.journal = None
+        self.journal_compact_bytes = int(get_config_value('storage', 'journal_compact_kb', fallback='256')) * 1024
+        self._snapshot_lock = threading.RLock()
+        self._compaction_thread = None
+
+        self.search_index = None
+
+        # Degree of parallelism for bulk body reads (startup backfill, export, re-indexing)
+        self.io_workers = max(1, int(get_config_value('storage', 'io_workers', fallback='8')))
+
+        # Decoded bodies are served from a bounded LRU cache instead of living in the records
+        cache_mb = float(get_config_value('storage', 'body_cache_mb', fallback='32'))
+        self.body_cache = BodyCache(int(cache_mb * 1024 * 1024))
+
+        # Records resolve body_html / body_plain lazily from body_file
+        EmailRecord.body_loader = self.load_body_from_file_raw
+        EmailRecord.texts_loader = self.load_texts
+
+        self.layout_migrator = BodyLayoutMigrator(self)
+        self._store_lock_file = None
+
+        # Storage mode is resolved once; an optional watcher handles runtime switches
+        self.profile: Optional[StorageProfile] = None
+        self.profile_listeners = []
+        self._apply_profile(StorageProfile.resolve(self.default_csv_path, self.test_csv_path))
+
+        self.profile_watcher = None
+        if get_config_value('storage', 'watch_test_mode', fallback='false').strip().lower() in ('1', 'true', 'yes', 'on'):
+            interval = float(get_config_value('storage', 'watch_interval_s', fallback='2'))
+            self.profile_watcher = ProfileWatcher(self.default_csv_path, self.test_csv_path,
+                                                  self._on_profile_change, interval)
+            self.profile_watcher.start(self.profile)
+
+    def _apply_profile(self, profile: StorageProfile) -> None:
+        """Point CSV, journal and search index at the given profile"""
+        with self._snapshot_lock:
+            self.profile = profile
+            self.csv_path = profile.csv_path
+
+            if self.journal is None or self.journal.path != profile.journal_path:
+                self.journal = MetadataJournal(profile.journal_path)
+
+            if self.search_index is None or self.search_index.db_path != profile.search_db_path:
+                old_index, self.search_index = self.search_index, SearchIndex(profile.search_db_path)
+                if old_index is not None:
+                    old_index.close()
+
+            self.snapshot = StartupSnapshot(profile.snapshot_path)
+
+        if profile.is_test:
             print(f"[STORAGE] Test mode detected - using {self.test_csv_path}")
-        else:
-            self.csv_path = self.default_csv_path
+
+    def _on_profile_change(self, profile: StorageProfile) -> None:
+        """Watcher callback: switch storage and notify listeners (e.g. the UI)"""
+        print(f"[STORAGE] Storage profile switched to '{profile.name}' ({profile.csv_path})")
+        self._apply_profile(profile)
+        for listener in list(self.profile_listeners):
+            try:
+                listener(profile)
+            except Exception as e:
+                print(f"[STORAGE] Profile listener failed: {e}")
+
+    def acquire_store_lock(self) -> bool:
+        """Claim the data directory for this process (the app, or an offline import)
+
+        An OS file lock on data/store.lock, released when the process exits (or by
+        release_store_lock). Returns False if another process holds it.
+        """
+        if self._store_lock_file is not None:
+            return True
+        handle = open(STORE_LOCK_PATH, "a+b")
+        handle.seek(0)
+        try:
+            if os.name == "nt":
+                import msvcrt
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._store_lock_file = handle
+        return True
+
+    def release_store_lock(self) -> None:
+        """Give up the data directory lock taken by acquire_store_lock"""
+        if self._store_lock_file is not None:
+            self._store_lock_file.close()  # closing the handle drops the OS lock
+            self._store_lock_file = None
 
     def is_test_mode(self) -> bool:
-        """Check if currently in test mode"""
-        self._update_mode()
-        return self.csv_path == self.test_csv_path
+        """Check if currently in test mode (resolved profile, no filesystem access)"""
+        return self.profile.read_only
+
+    def start_layout_migration(self):
+        """Move flat data/bodies/<id>.* files into the sharded layout in the background"""
+        if self.body_pack is not None:
+            return None
+        return self.layout_migrator.start()
 
     def save_body_to_file(self, message_id: str, body_plain: str, body_html: str) -> tuple:
-        """Save email body to data/bodies/ folder
+        """Save email body to the sharded data/bodies/ab/cd/ tree
 
         Args:
             message_id: Email message ID
@@ -37,25 +155,37 @@ class StorageService:
             body_html: HTML body
 
         Returns:
-            tuple: (file_path, format) e.g. ('data/bodies/abc123.html', 'html')
+            tuple: (file_path, format) e.g. ('data/bodies/3f/a2/abc123.html', 'html')
         """
-        os.makedirs("data/bodies", exist_ok=True)
+        if self.body_pack is not None:
+            try:
+                if body_html and body_html.strip():
+                    return self.body_pack.put(body_html, 'html'), 'html'
+                if body_plain and body_plain.strip():
+                    return self.body_pack.put(body_plain, 'txt'), 'plain'
+            except Exception as e:
+                print(f"[STORAGE] Error saving body to pack store for {message_id}: {e}")
+            return '', ''
 
         # Prefer HTML if available, otherwise use plain text
         if body_html and body_html.strip():
-            file_path = f"data/bodies/{message_id}.html"
+            file_path = sharded_body_path(message_id, 'html').replace(os.sep, '/')
             try:
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(body_html)
+                self.body_cache.invalidate(file_path)
                 return file_path, 'html'
             except Exception as e:
                 print(f"[STORAGE] Error saving HTML body for {message_id}: {e}")
 
         if body_plain and body_plain.strip():
-            file_path = f"data/bodies/{message_id}.txt"
+            file_path = sharded_body_path(message_id, 'txt').replace(os.sep, '/')
             try:
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
                 with open(file_path, 'w', encoding='utf-8') as f:
                     f.write(body_plain)
+                self.body_cache.invalidate(file_path)
                 return file_path, 'plain'
             except Exception as e:
                 print(f"[STORAGE] Error saving plain body for {message_id}: {e}")
@@ -63,6 +193,34 @@ class StorageService:
         # No body available
         return '', ''
 
+    def save_text_body(self, message_id: str, body_text: str, body_file: str, body_format: str) -> str:
+        """Persist the plain-text body extracted at ingest
+
+        Plain-format bodies are their own text file; for HTML bodies the extracted
+        text is written next to it ('<message_id>.text' / 'pack:<digest>.text').
+
+        Returns:
+            str: text_file reference ('' if there is no text)
+        """
+        if body_format == 'plain':
+            return body_file
+        if not body_text or not body_text.strip():
+            return ''
+
+        try:
+            if self.body_pack is not None:
+                return self.body_pack.put(body_text, 'text')
+
+            file_path = sharded_body_path(message_id, 'text').replace(os.sep, '/')
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(body_text)
+            self.body_cache.invalidate(file_path)
+            return file_path
+        except Exception as e:
+            print(f"[STORAGE] Error saving text body for {message_id}: {e}")
+            return ''
+
     def load_body_from_file(self, body_file: str) -> str:
         """Load email body from file
 
@@ -72,16 +230,14 @@ class StorageService:
         Returns:
             str: Body content (HTML stripped if applicable)
         """
-        if not body_file or not os.path.exists(body_file):
-            return "Nincs üzenet törzs."
-
         try:
-            with open(body_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = self._read_body_content(body_file)
+            if content is None:
+                return "Nincs üzenet törzs."
 
-            # If HTML, strip tags for display
+            # If HTML, convert to text for display
             if body_file.endswith('.html'):
-                content = self._strip_html(content)
+                content = html_to_text(content)
 
             return content if content.strip() else "Üres üzenet törzs."
 
@@ -89,21 +245,20 @@ class StorageService:
             print(f"[STORAGE] Error loading body from {body_file}: {e}")
             return f"Hiba a törzs betöltése közben: {e}"
 
-    def load_body_from_file_raw(self, body_file: str) -> tuple:
+    def load_body_from_file_raw(self, body_file: str, cached: bool = True) -> tuple:
         """Load email body from file WITHOUT stripping HTML
 
         Args:
             body_file: Path to body file
+            cached: Read through the body cache (False for bulk scans)
 
         Returns:
             tuple: (body_html, body_plain)
         """
-        if not body_file or not os.path.exists(body_file):
-            return ("", "")
-
         try:
-            with open(body_file, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = self._read_body_content(body_file, cached)
+            if content is None:
+                return ("", "")
 
             if body_file.endswith('.html'):
                 return (content, "")  # Return HTML as-is
@@ -114,100 +269,118 @@ class StorageService:
             print(f"[STORAGE] Error loading body from {body_file}: {e}")
             return ("", "")
 
-    def _strip_html(self, html_content: str) -> str:
-        """Strip HTML tags and decode entities
+    def load_bodies(self, body_files: List[str], max_workers: Optional[int] = None) -> List[tuple]:
+        """Load many bodies in parallel, preserving input order
+
+        Per-file open latency dominates on network home directories and cold caches,
+        so the reads are spread over a thread pool.
 
         Args:
-            html_content: HTML string
+            body_files: Body file paths / pack references
+            max_workers: Thread count (default: [storage] io_workers)
 
         Returns:
-            str: Plain text without HTML tags
+            List of (body_html, body_plain) tuples in the same order as body_files
         """
-        # Remove HTML tags
-        text = re.sub(r'<[^>]+>', '', html_content)
+        # Bulk scans bypass the body cache so they do not evict interactively used bodies
+        def load(body_file):
+            return self.load_body_from_file_raw(body_file, cached=False)
 
-        # Decode common HTML entities
-        text = text.replace('&nbsp;', ' ')
-        text = text.replace('&amp;', '&')
-        text = text.replace('&lt;', '<')
-        text = text.replace('&gt;', '>')
-        text = text.replace('&quot;', '"')
-        text = text.replace('&#39;', "'")
-        text = text.replace('&apos;', "'")
+        workers = max_workers or self.io_workers
+        if workers <= 1 or len(body_files) <= 1:
+            return [load(f) for f in body_files]
 
-        # Remove excessive whitespace
-        text = re.sub(r'\n\s*\n', '\n\n', text)  # Max 2 consecutive newlines
-        text = re.sub(r' +', ' ', text)  # Collapse multiple spaces
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="body-io") as pool:
+            return list(pool.map(load, body_files))
 
-        return text.strip()
+    def load_texts(self, emails: List[Dict], max_workers: Optional[int] = None) -> List[str]:
+        """Load the precomputed plain-text bodies of many emails in parallel (order preserved)
+
+        Like load_bodies, the files are read past the body cache (startup search
+        backfill and archiving must not evict interactively used bodies).
+        """
+        def text_of(email):
+            text_file = email.get("text_file", "")
+            if text_file:
+                return self.load_body_from_file_raw(text_file, cached=False)[1] or ""
+            body_file = email.get("body_file", "")
+            if not body_file:
+                return email.get("body_text", "") or ""  # inline body (no file behind it)
+
+            # Rows stored before text extraction: derive from the raw body
+            body_html, body_plain = self.load_body_from_file_raw(body_file, cached=False)
+            return body_plain if (body_plain or "").strip() else html_to_text(body_html or "")
+
+        workers = max_workers or self.io_workers
+        if workers <= 1 or len(emails) <= 1:
+            return [text_of(e) for e in emails]
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="body-io") as pool:
+            return list(pool.map(text_of, emails))
+
+    def iter_with_bodies(self, emails: Iterable[Dict], chunk_size: int = 256,
+                         max_workers: Optional[int] = None) -> Iterator[Tuple[Dict, str, str]]:
+        """Yield (email, body_html, body_plain) in order, reading bodies chunk-wise in parallel
+
+        Only one chunk of bodies is held in memory at a time.
+        """
+        chunk: List[Dict] = []
+        for email in emails:
+            chunk.append(email)
+            if len(chunk) >= chunk_size:
+                yield from self._with_bodies(chunk, max_workers)
+                chunk = []
+        if chunk:
+            yield from self._with_bodies(chunk, max_workers)
+
+    def _with_bodies(self, chunk: List[Dict], max_workers: Optional[int]) -> Iterator[Tuple[Dict, str, str]]:
+        bodies = self.load_bodies([e.get("body_file", "") for e in chunk], max_workers)
+        for email, (body_html, body_plain) in zip(chunk, bodies):
+            yield email, body_html, body_plain
+
+    def _read_body_content(self, body_file: str, cached: bool = True) -> Optional[str]:
+        """Read raw body content from a file path or a pack store reference
+
+        Returns:
+            str content, or None if the body does not exist
+        """
+        if not body_file:
+            return None
+        if cached:
+            return self.body_cache.get(body_file, self._read_body_uncached)
+        return self._read_body_uncached(body_file)
+
+    def _read_body_uncached(self, body_file: str) -> Optional[str]:
+        if BodyPackStore.is_ref(body_file):
+            if self.body_pack is None:
+                # Pack references stay readable even if the backend was switched back
+                self.body_pack = BodyPackStore.shared()
+            return self.body_pack.get(body_file)
+
+        if body_file.startswith(ARCHIVE_PREFIX):
+            return self.archive_store().get(body_file)
+
+        # Old flat paths and new sharded paths both resolve; retry once in case
+        # the layout migrator moved the file between lookup and open
+        for _attempt in range(2):
+            path = resolve_body_path(body_file)
+            if path is None:
+                return None
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return f.read()
+            except FileNotFoundError:
+                continue
+        return None
 
     def load_emails(self) -> List[Dict]:
         """Load emails from CSV file"""
-        self._update_mode()
-
         if not os.path.exists(self.csv_path):
             print(f"[STORAGE] CSV file not found: {self.csv_path}")
             return []
 
-        emails = []
         try:
-            with open(self.csv_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Parse attachment names and MIME types (support both ; and | separators)
-                    attachment_names = re.split(r'[;|]', row.get("attachment_names", ""))
-                    attachment_names = [a.strip() for a in attachment_names if a.strip()]
-
-                    mime_types = re.split(r'[;|]', row.get("mime_types", ""))
-                    mime_types = [m.strip() for m in mime_types if m.strip()]
-
-                    # Convert numeric fields
-                    try:
-                        attachment_count = int(row.get("attachment_count", 0))
-                    except (ValueError, TypeError):
-                        attachment_count = 0
-
-                    try:
-                        is_last_downloaded = int(row.get("is_last_downloaded", 0))
-                    except (ValueError, TypeError):
-                        is_last_downloaded = 0
-
-                    try:
-                        needs_more_info = int(row.get("needs_more_info", 0))
-                    except (ValueError, TypeError):
-                        needs_more_info = 0
-
-                    # Build email dict with all fields
-                    email = {
-                        "message_id": row.get("message_id", ""),
-                        "sender": row.get("sender", ""),
-                        "sender_name": row.get("sender_name", ""),
-                        "sender_domain": row.get("sender_domain", ""),
-                        "subject": row.get("subject", ""),
-                        "datetime": row.get("datetime", ""),
-                        "attachment_count": attachment_count,
-                        "attachment_names": attachment_names,
-                        "mime_types": mime_types,
-                        "tag": row.get("tag", "----"),
-                        "is_last_downloaded": is_last_downloaded,
-                        "needs_more_info": needs_more_info,
-                        "rule_applied": row.get("rule_applied", ""),
-                        "body_file": row.get("body_file", ""),
-                        "body_format": row.get("body_format", ""),
-                        "ai_summary": row.get("ai_summary", "")
-                    }
-
-                    # Load body content from file (RAW - don't strip HTML)
-                    if email["body_file"]:
-                        body_html, body_plain = self.load_body_from_file_raw(email["body_file"])
-                        email["body_html"] = body_html
-                        email["body_plain"] = body_plain
-                    else:
-                        email["body_html"] = ""
-                        email["body_plain"] = ""
-
-                    emails.append(email)
-
+            emails = list(self.iter_emails())
             print(f"[STORAGE] Loaded {len(emails)} emails from {self.csv_path}")
             return emails
 
@@ -217,14 +390,186 @@ class StorageService:
             traceback.print_exc()
             return []
 
-    def sync_emails(self, new_emails: List[Dict]) -> List[Dict]:
-        """Sync new emails with existing storage. Gmail a golden source a metaadatokra és címkékre."""
-        self._update_mode()
+    def load_startup_emails(self) -> Tuple[List[Dict], object]:
+        """Load the working set for launch, preferring the binary snapshot
+
+        Returns:
+            (emails, rules_sig) - rules_sig is the rule set signature already applied
+            to the snapshot records, None when loaded from CSV
+        """
+        loaded = self.snapshot.load(self.csv_path)
+        if loaded is None:
+            return self.load_emails(), None
+
+        emails, rules_sig = loaded
+        overlay = self.journal.replay()
+        if overlay:
+            for email in emails:
+                changes = overlay.get(email.message_id)
+                if changes:
+                    email.update(changes)
 
+        print(f"[STORAGE] Loaded {len(emails)} emails from snapshot {self.snapshot.path}")
+        return emails, rules_sig
+
+    def csv_signature(self):
+        """(mtime_ns, size) of the working CSV"""
+        return file_signature(self.csv_path)
+
+    def write_snapshot(self, emails: List[Dict], rules_sig=None, expected_csv_sig=None) -> bool:
+        """Write the startup snapshot for the current CSV
+
+        Args:
+            emails: Working set mirroring the CSV
+            rules_sig: Rule set already applied to the emails
+            expected_csv_sig: CSV signature the emails were loaded at (skip if it changed since)
+        """
+        return self.snapshot.save(emails, self.csv_path, rules_sig, expected_csv_sig)
+
+    def iter_emails(self, where=None, fields: Optional[Iterable[str]] = None,
+                    chunk_size: int = 256) -> Iterator[Dict]:
+        """Stream stored emails row by row (constant memory)
+
+        Filters are evaluated on the raw CSV rows (after the journal overlay), before
+        any record is built or body is read.
+
+        Args:
+            where: Filter - dict with any of 'tag' (str or collection of tags), 'date_from',
+                'date_to' ('YYYY.MM.DD[ HH:MM]', inclusive), 'has_attachments' (bool);
+                or a callable taking the raw row dict and returning bool
+            fields: Fields to return. None yields full EmailRecord objects (bodies lazy);
+                otherwise plain dicts with only these fields - 'body_html' / 'body_plain'
+                are read (in parallel, chunk-wise) only when requested
+            chunk_size: Rows per parallel body-read chunk
+
+        Yields:
+            EmailRecord, or dict of the requested fields
+        """
+        if not os.path.exists(self.csv_path):
+            return
+
+        match = self._compile_where(where)
+        fields = tuple(fields) if fields is not None else None
+        want_bodies = fields is not None and bool(set(fields) & set(EmailRecord.BODY_FIELDS))
+
+        # Journaled tag/summary/flag edits are folded in before filtering
+        overlay = self.journal.replay()
+
+        with open(self.csv_path, 'r', encoding='utf-8') as f:
+            chunk = []
+            for row in csv.DictReader(f):
+                changes = overlay.get(row.get("message_id"))
+                if changes:
+                    row.update(changes)
+                if match is not None and not match(row):
+                    continue
+
+                if fields is None:
+                    yield self._row_to_record(row)
+                elif not want_bodies:
+                    record = self._row_to_record(row)
+                    yield {name: record.get(name, "") for name in fields}
+                else:
+                    chunk.append(self._row_to_record(row))
+                    if len(chunk) >= chunk_size:
+                        yield from self._project_with_bodies(chunk, fields)
+                        chunk = []
+
+            if chunk:
+                yield from self._project_with_bodies(chunk, fields)
+
+    def _project_with_bodies(self, chunk: List[Dict], fields: Tuple[str, ...]) -> Iterator[Dict]:
+        for record, body_html, body_plain in self._with_bodies(chunk, None):
+            bodies = {"body_html": body_html, "body_plain": body_plain}
+            yield {name: bodies[name] if name in bodies else record.get(name, "") for name in fields}
+
+    @staticmethod
+    def _compile_where(where):
+        """Turn a where-spec into a predicate over raw CSV rows (None = no filter)"""
+        if where is None or callable(where):
+            return where
+
+        unknown = set(where) - {"tag", "date_from", "date_to", "has_attachments"}
+        if unknown:
+            raise ValueError(f"Unsupported filter(s): {', '.join(sorted(unknown))}")
+
+        tags = where.get("tag")
+        if isinstance(tags, str):
+            tags = {tags}
+        elif tags is not None:
+            tags = set(tags)
+        date_from = where.get("date_from")
+        date_to = where.get("date_to")
+        if date_to is not None and len(date_to) <= 10:
+            date_to += " 99:99"  # whole day inclusive
+        has_attachments = where.get("has_attachments")
+
+        def match(row: Dict) -> bool:
+            if tags is not None and (row.get("tag") or "----") not in tags:
+                return False
+            dt = row.get("datetime", "")
+            if date_from is not None and dt < date_from:
+                return False
+            if date_to is not None and dt > date_to:
+                return False
+            if has_attachments is not None:
+                try:
+                    count = int(row.get("attachment_count") or 0)
+                except ValueError:
+                    count = 0
+                if (count > 0) != has_attachments:
+                    return False
+            return True
+
+        return match
+
+    @staticmethod
+    def _row_to_record(row: Dict) -> EmailRecord:
+        """Build a record from a CSV row
+
+        Attachment names / MIME types (both ; and | separators) and numeric fields
+        are normalized by EmailRecord; bodies stay on disk (body_file).
+        Rows written before sender normalization get the sender fields computed here.
+        """
+        record = EmailRecord({
+            "message_id": row.get("message_id", ""),
+            "sender": row.get("sender", ""),
+            "sender_name": row.get("sender_name", ""),
+            "sender_domain": row.get("sender_domain", ""),
+            "subject": row.get("subject", ""),
+            "datetime": row.get("datetime", ""),
+            "attachment_count": row.get("attachment_count", 0),
+            "attachment_names": row.get("attachment_names", ""),
+            "mime_types": row.get("mime_types", ""),
+            "tag": row.get("tag", "----"),
+            "is_last_downloaded": row.get("is_last_downloaded", 0),
+            "needs_more_info": row.get("needs_more_info", 0),
+            "rule_applied": row.get("rule_applied", ""),
+            "body_file": row.get("body_file", ""),
+            "body_format": row.get("body_format", ""),
+            "ai_summary": row.get("ai_summary", ""),
+            "text_file": row.get("text_file", ""),
+            "sender_address": row.get("sender_address", ""),
+            "sender_reg_domain": row.get("sender_reg_domain", ""),
+        })
+        if not record.sender_address:
+            apply_sender_info(record)
+        return record
+
+    def sync_emails(self, new_emails: List[Dict], existing_emails: Optional[List[Dict]] = None,
+                    rules_sig=None) -> List[Dict]:
+        """Sync new emails with existing storage. Gmail a golden source a metaadatokra és címkékre.
+
+        Args:
+            new_emails: Emails fetched from Gmail
+            existing_emails: Already loaded emails (in-memory repository); loaded from CSV if None
+            rules_sig: Rule set already applied to the emails (stamped on the startup snapshot)
+        """
         print(f"[STORAGE] sync_emails() called with {len(new_emails)} new emails")
 
-        # 1) Betöltjük a meglévő emaileket CSV-ből
-        existing_emails = self.load_emails()
+        # 1) Meglévő emailek: a memóriában lévő repository-ból, vagy CSV-ből
+        if existing_emails is None:
+            existing_emails = self.load_emails()
         existing_by_id = {e.get("message_id"): e for e in existing_emails}
 
         # 2) Minden meglévőnél lenullázzuk az is_last_downloaded flag-et
@@ -232,6 +577,7 @@ class StorageService:
             email["is_last_downloaded"] = 0
 
         updated_or_new: List[Dict] = []
+        search_docs: List[Dict] = []
 
         for fresh in new_emails:
             msg_id = fresh.get("message_id")
@@ -242,6 +588,18 @@ class StorageService:
             # BODY-t vegyük ki külön, hogy fájlba írást egységesen kezeljük
             fresh_body_plain = fresh.pop("body_plain", "")
             fresh_body_html = fresh.pop("body_html", "")
+            fresh.pop("body_text", None)
+
+            # Plain-text body: egyszer, itt állítjuk elő (AI, keresés, előnézet ezt olvassa)
+            body_text = fresh_body_plain if fresh_body_plain.strip() else html_to_text(fresh_body_html)
+
+            search_docs.append({
+                "message_id": msg_id,
+                "subject": fresh.get("subject", ""),
+                "sender": fresh.get("sender", ""),
+                "sender_name": fresh.get("sender_name", ""),
+                "body_text": body_text,
+            })
 
             if msg_id in existing_by_id:
                 # ===== MEGLÉVŐ EMAIL: GMAIL FELÜLÍRJA A METAADATOT + TAG-ET =====
@@ -250,6 +608,7 @@ class StorageService:
                 # Ezeket MINDIG frissítjük a Gmail alapján
                 fields_from_gmail = [
                     "sender", "sender_name", "sender_domain",
+                    "sender_address", "sender_reg_domain",
                     "subject", "datetime",
                     "attachment_count", "attachment_names",
                     "mime_types", "tag",
@@ -271,15 +630,7 @@ class StorageService:
                 )
                 stored["body_file"] = body_file
                 stored["body_format"] = body_format
-
-                if body_file:
-                    body_html_loaded, body_plain_loaded = self.load_body_from_file_raw(body_file)
-                    stored["body_html"] = body_html_loaded
-                    stored["body_plain"] = body_plain_loaded
-                else:
-                    stored["body_html"] = ""
-                    stored["body_plain"] = ""
-
+                stored["text_file"] = self.save_text_body(msg_id, body_text, body_file, body_format)
                 stored["is_last_downloaded"] = 1
                 updated_or_new.append(stored)
             else:
@@ -294,86 +645,311 @@ class StorageService:
 
                 fresh["body_file"] = body_file
                 fresh["body_format"] = body_format
+                fresh["text_file"] = self.save_text_body(msg_id, body_text, body_file, body_format)
                 fresh["is_last_downloaded"] = 1
 
-                if body_file:
-                    body_html_loaded, body_plain_loaded = self.load_body_from_file_raw(body_file)
-                    fresh["body_html"] = body_html_loaded
-                    fresh["body_plain"] = body_plain_loaded
-                else:
-                    fresh["body_html"] = ""
-                    fresh["body_plain"] = ""
-
-                updated_or_new.append(fresh)
+                # Body marad a fájlban, a rekord csak hivatkozást tart
+                updated_or_new.append(EmailRecord(fresh))
 
         # 3) Azok, amiket most NEM érintett a Gmail (pl. régi, archív mappa stb.), maradjanak
-        untouched = [
-            e for e in existing_emails
-            if e.get("message_id") not in {n.get("message_id") for n in updated_or_new}
-        ]
+        touched_ids = {n.get("message_id") for n in updated_or_new}
+        untouched = [e for e in existing_emails if e.get("message_id") not in touched_ids]
 
         all_emails = updated_or_new + untouched
 
         # 4) Mentés CSV-be
-        self._save_to_csv(all_emails)
+        self._save_to_csv(all_emails, rules_sig)
+
+        # 5) Keresési index inkrementális frissítése
+        try:
+            self.search_index.index_emails(search_docs)
+        except Exception as e:
+            print(f"[STORAGE] Search index update failed: {e}")
 
         print(f"[STORAGE] Synced {len(updated_or_new)} emails from Gmail. Total stored: {len(all_emails)}")
         return all_emails
 
 
-    def save_emails(self, emails: List[Dict]) -> None:
+    def ensure_search_index(self, emails: List[Dict]) -> int:
+        """Index emails that are missing from the search index (startup backfill)
+
+        Args:
+            emails: Loaded email dicts
+
+        Returns:
+            int: Number of newly indexed emails
+        """
+        indexed = self.search_index.indexed_ids()
+        missing = [e for e in emails if e.get("message_id") not in indexed]
+        if not missing:
+            return 0
+
+        count = 0
+        for start in range(0, len(missing), 256):
+            chunk = missing[start:start + 256]
+            texts = self.load_texts(chunk)
+            count += self.search_index.index_emails({
+                "message_id": email.get("message_id"),
+                "subject": email.get("subject", ""),
+                "sender": email.get("sender", ""),
+                "sender_name": email.get("sender_name", ""),
+                "body_text": text,
+            } for email, text in zip(chunk, texts))
+        print(f"[STORAGE] Search index backfilled with {count} emails")
+        return count
+
+    def search(self, text: str, limit: int = 1000) -> List[str]:
+        """Full-text search over subject, sender and body; returns message IDs"""
+        try:
+            return self.search_index.search(text, limit=limit)
+        except Exception as e:
+            print(f"[STORAGE] Search failed: {e}")
+            return []
+
+    # ---------- Archive tier (cold storage) ----------
+
+    @property
+    def archive_csv_path(self) -> str:
+        """Metadata of archived emails (kept out of the working set)"""
+        return self.profile.archive_csv_path
+
+    def archive_store(self) -> BodyPackStore:
+        """Compressed archive segments, opened on first use (one store per process)"""
+        return BodyPackStore.shared(ARCHIVE_SEGMENTS_DIR, ref_prefix=ARCHIVE_PREFIX)
+
+    def iter_archived(self, where=None) -> Iterator[EmailRecord]:
+        """Stream archived email records (same filters as iter_emails)"""
+        if not os.path.exists(self.archive_csv_path):
+            return
+        match = self._compile_where(where)
+        with open(self.archive_csv_path, 'r', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if match is None or match(row):
+                    yield self._row_to_record(row)
+
+    def load_archived(self, message_ids: Iterable[str]) -> List[EmailRecord]:
+        """Load archived emails on demand (e.g. search hits outside the working set)"""
+        wanted = set(message_ids)
+        if not wanted:
+            return []
+        return list(self.iter_archived(where=lambda row: row.get("message_id") in wanted))
+
+    def save_emails(self, emails: List[Dict], rules_sig=None) -> bool:
         """Save emails to CSV (used after categorization)
 
         Args:
             emails: List of email dicts to save
+            rules_sig: Rule set already applied to the emails (None = rules run again at next launch)
+
+        Returns:
+            bool: True if the CSV was written (False in test mode or on error)
         """
         if self.is_test_mode():
             print("[STORAGE] Test mode - skipping save to prevent overwriting test data")
-            return
+            return False
 
-        self._save_to_csv(emails)
+        if not self._save_to_csv(emails, rules_sig):
+            return False
         print(f"[STORAGE] Saved {len(emails)} emails to {self.csv_path}")
+        return True
+
+    def update_email_fields(self, message_id: str, fields: Dict) -> bool:
+        """Persist tag/summary/flag changes of one email as a journal append
+
+        Args:
+            message_id: Email message ID
+            fields: Changed fields, e.g. {'tag': 'neptun'}
+
+        Returns:
+            bool: True if the change was journaled
+        """
+        return self.update_emails_fields([(message_id, fields)]) > 0
 
-    def _save_to_csv(self, emails: List[Dict]) -> None:
-        """Internal method to write emails to CSV"""
-        fieldnames = [
-            "message_id", "sender", "sender_name", "sender_domain",
-            "subject", "datetime", "attachment_count", "attachment_names",
-            "mime_types", "tag", "is_last_downloaded", "needs_more_info",
-            "rule_applied", "body_file", "body_format", "ai_summary"
-        ]
+    def update_emails_fields(self, updates: List[Tuple[str, Dict]]) -> int:
+        """Persist field changes of several emails with one journal write
+
+        Args:
+            updates: List of (message_id, {field: value}) pairs
+
+        Returns:
+            int: Number of journaled records, -1 if the journal could not be written
+        """
+        if self.is_test_mode():
+            print("[STORAGE] Test mode - skipping save to prevent overwriting test data")
+            return 0
+
+        try:
+            written = self.journal.append_many(updates)
+        except Exception as e:
+            print(f"[STORAGE] Error writing metadata journal: {e}")
+            return -1
+
+        if self.journal.size() >= self.journal_compact_bytes:
+            self._schedule_compaction()
+        return written
+
+    def _schedule_compaction(self) -> None:
+        """Start background journal compaction unless one is already running"""
+        if self._compaction_thread and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(target=self.compact_journal,
+                                                   name="journal-compaction", daemon=True)
+        self._compaction_thread.start()
+
+    def compact_journal(self) -> None:
+        """Fold the metadata journal into the CSV snapshot (runs off the UI thread)"""
+        with self._snapshot_lock:
+            journal = self.journal
+            if not journal.begin_compaction():
+                return
+
+            try:
+                overlay = journal.replay()
+                if not self._rewrite_csv(overlay):
+                    # No CSV to fold into - the frozen journal stays and is replayed
+                    return
+                journal.finish_compaction()
+                print(f"[STORAGE] Journal compacted into {self.csv_path} ({len(overlay)} emails)")
+            except Exception as e:
+                # Frozen journal stays on disk and is replayed / retried later
+                print(f"[STORAGE] Journal compaction failed: {e}")
+
+    def exclusive(self):
+        """Lock held by every CSV rewrite (saves, compaction, removal)
+
+        Hold it to read and rewrite the CSV as one step; it is reentrant, so the
+        storage methods can still be called inside.
+        """
+        return self._snapshot_lock
+
+    def remove_emails(self, message_ids: Iterable[str]) -> Optional[Dict[str, Dict]]:
+        """Drop emails from the working CSV (e.g. after moving them to the archive)
+
+        Journaled changes of the remaining emails are folded in, like in compact_journal.
+
+        Returns:
+            Journaled changes of the removed emails (message_id -> fields; they are gone
+            from the working set now), or None if the CSV was not rewritten (test mode, error)
+        """
+        if self.is_test_mode():
+            print("[STORAGE] Test mode - skipping save to prevent overwriting test data")
+            return None
+
+        removed = set(message_ids)
+        with self._snapshot_lock:
+            journal = self.journal
+            frozen = journal.begin_compaction()
+            try:
+                overlay = journal.replay()
+                if self._rewrite_csv(overlay, removed) and frozen:
+                    journal.finish_compaction()
+            except Exception as e:
+                print(f"[STORAGE] Error removing emails from {self.csv_path}: {e}")
+                return None
+
+        print(f"[STORAGE] Removed {len(removed)} emails from {self.csv_path}")
+        return {msg_id: changes for msg_id, changes in overlay.items() if msg_id in removed}
+
+    def _rewrite_csv(self, overlay: Dict[str, Dict], removed=frozenset()) -> bool:
+        """Rewrite the CSV (and the startup snapshot mirroring it) with overlay applied and removed rows dropped
+
+        Returns:
+            bool: False if there is no CSV (nothing was written)
+        """
+        # The snapshot mirrors the CSV being rewritten - refreshed below
+        snapshot = self.snapshot.load(self.csv_path)
+        if not os.path.exists(self.csv_path):
+            return False
+
+        with open(self.csv_path, 'r', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            fieldnames = list(reader.fieldnames or self.CSV_FIELDNAMES)
+            rows = []
+            for row in reader:
+                msg_id = row.get("message_id")
+                if msg_id in removed:
+                    continue
+                changes = overlay.get(msg_id)
+                if changes:
+                    row.update({k: v for k, v in changes.items() if k in fieldnames})
+                rows.append(row)
+
+        self._write_rows_atomic(fieldnames, rows)
+
+        if snapshot is not None:
+            records, rules_sig = snapshot
+            records = [record for record in records if record.message_id not in removed]
+            for record in records:
+                changes = overlay.get(record.message_id)
+                if changes:
+                    record.update(changes)
+            self.snapshot.save(records, self.csv_path, rules_sig)
+        return True
+
+    def _write_rows_atomic(self, fieldnames: List[str], rows, path: Optional[str] = None) -> None:
+        """Write CSV rows to a temp file and atomically replace the snapshot (or another CSV)"""
+        path = path or self.csv_path
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def email_to_row(email: Dict) -> Dict:
+        """CSV row of an email (lists become pipe-separated strings)"""
+        return {
+            "message_id": email.get("message_id", ""),
+            "sender": email.get("sender", ""),
+            "sender_name": email.get("sender_name", ""),
+            "sender_domain": email.get("sender_domain", ""),
+            "subject": email.get("subject", ""),
+            "datetime": email.get("datetime", ""),
+            "attachment_count": email.get("attachment_count", 0),
+            "attachment_names": "|".join(email.get("attachment_names", [])) if isinstance(
+                email.get("attachment_names"), (list, tuple)) else email.get("attachment_names", ""),
+            "mime_types": "|".join(email.get("mime_types", [])) if isinstance(email.get("mime_types"),
+                                                                              (list, tuple)) else email.get(
+                "mime_types", ""),
+            "tag": email.get("tag", "----"),
+            "is_last_downloaded": email.get("is_last_downloaded", 0),
+            "needs_more_info": email.get("needs_more_info", 0),
+            "rule_applied": email.get("rule_applied", ""),
+            "body_file": email.get("body_file", ""),
+            "body_format": email.get("body_format", ""),
+            "ai_summary": email.get("ai_summary", ""),
+            "text_file": email.get("text_file", ""),
+            "sender_address": email.get("sender_address", ""),
+            "sender_reg_domain": email.get("sender_reg_domain", "")
+        }
+
+    def _save_to_csv(self, emails: List[Dict], rules_sig=None) -> bool:
+        """Internal method to write emails to CSV (full snapshot, replaces the journal)
+
+        Returns:
+            bool: True if the snapshot was written
+        """
+        def rows():
+            for email in emails:
+                yield self.email_to_row(email)
 
         try:
-            with open(self.csv_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-
-                for email in emails:
-                    # Convert lists to pipe-separated strings
-                    row = {
-                        "message_id": email.get("message_id", ""),
-                        "sender": email.get("sender", ""),
-                        "sender_name": email.get("sender_name", ""),
-                        "sender_domain": email.get("sender_domain", ""),
-                        "subject": email.get("subject", ""),
-                        "datetime": email.get("datetime", ""),
-                        "attachment_count": email.get("attachment_count", 0),
-                        "attachment_names": "|".join(email.get("attachment_names", [])) if isinstance(
-                            email.get("attachment_names"), list) else email.get("attachment_names", ""),
-                        "mime_types": "|".join(email.get("mime_types", [])) if isinstance(email.get("mime_types"),
-                                                                                          list) else email.get(
-                            "mime_types", ""),
-                        "tag": email.get("tag", "----"),
-                        "is_last_downloaded": email.get("is_last_downloaded", 0),
-                        "needs_more_info": email.get("needs_more_info", 0),
-                        "rule_applied": email.get("rule_applied", ""),
-                        "body_file": email.get("body_file", ""),
-                        "body_format": email.get("body_format", ""),
-                        "ai_summary": email.get("ai_summary", "")
-                    }
-                    writer.writerow(row)
+            with self._snapshot_lock:
+                # Freeze the journal first: edits appended during the write go to a fresh
+                # file and survive, only the frozen part is contained in the snapshot
+                frozen = self.journal.begin_compaction()
+                self._write_rows_atomic(self.CSV_FIELDNAMES, rows())
+                if frozen:
+                    self.journal.finish_compaction()
+                self.write_snapshot(emails, rules_sig)
+            return True
 
         except Exception as e:
             print(f"[STORAGE] Error saving to CSV: {e}")
             import traceback
             traceback.print_exc()
+            return False
@@ -9,6 +9,9 @@ import configparser
 import os
 from typing import Dict
 
+from business import rules_service
+from business.rules_engine import RULE_STATS, get_rule_summary
+
 
 class SettingsWindow:
     def __init__(self, parent: tk.Tk) -> None:
@@ -55,13 +58,16 @@ class SettingsWindow:
         # Create tabs
         self.rules_tab = ttk.Frame(notebook)
         self.general_tab = ttk.Frame(notebook)
+        self.diagnostics_tab = ttk.Frame(notebook)
 
         notebook.add(self.rules_tab, text="Szabályok")
         notebook.add(self.general_tab, text="Általános")
+        notebook.add(self.diagnostics_tab, text="Diagnosztika")
 
         # Populate tabs
         self._create_rules_tab()
         self._create_general_tab()
+        self._create_diagnostics_tab()
 
         # Buttons at bottom
         button_frame = tk.Frame(self.window, bg="#E4E2E2")
@@ -218,6 +224,66 @@ class SettingsWindow:
                 bg="#EDECEC", fg="#555", font=("", 8), anchor="w").grid(row=5, column=1,
                                                                         sticky="w", padx=10)
 
+    def _create_diagnostics_tab(self) -> None:
+        """Create the rule statistics tab (hits per rule, no-match rate, timing)"""
+        frame = tk.Frame(self.diagnostics_tab, bg="#EDECEC")
+        frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+        self.diag_summary_var = tk.StringVar()
+        tk.Label(frame, textvariable=self.diag_summary_var, bg="#EDECEC", fg="#333",
+                 font=("", 9), anchor="w", justify="left").pack(fill="x", pady=(0, 10))
+
+        columns = ("name", "tag", "priority", "hits", "avg_us")
+        self.diag_tree = ttk.Treeview(frame, columns=columns, show="headings", height=15)
+        for column, heading, width in (("name", "Szabály", 200), ("tag", "Címke", 120),
+                                       ("priority", "Prioritás", 80), ("hits", "Találat", 80),
+                                       ("avg_us", "Átlag idő (µs)", 120)):
+            self.diag_tree.heading(column, text=heading)
+            self.diag_tree.column(column, width=width, anchor="w" if column in ("name", "tag") else "e")
+        self.diag_tree.pack(fill="both", expand=True)
+
+        tk.Label(frame, text="0 találat = soha nem illeszkedő szabály. Szabályonkénti idő: "
+                             "[general] rule_profiling = true",
+                 bg="#EDECEC", fg="#555", font=("", 8), anchor="w").pack(fill="x", pady=(5, 0))
+
+        button_frame = tk.Frame(frame, bg="#EDECEC")
+        button_frame.pack(fill="x", pady=(5, 0))
+        tk.Button(button_frame, text="Frissítés", command=self._refresh_diagnostics,
+                  bg="#E4E2E2", fg="#000", font=("", 8)).pack(side="left")
+        tk.Button(button_frame, text="Nullázás", command=self._reset_diagnostics,
+                  bg="#E4E2E2", fg="#000", font=("", 8)).pack(side="left", padx=5)
+
+        self._refresh_diagnostics()
+
+    def _refresh_diagnostics(self) -> None:
+        """Fill the diagnostics tab from the current rule statistics"""
+        summary = get_rule_summary()
+        stats = summary["stats"]
+        memo = summary["sender_memo"]
+        lookups = memo["hits"] + memo["misses"]
+
+        self.diag_summary_var.set(
+            f"Kiértékelt emailek: {stats['evaluated']}  |  "
+            f"Nem illeszkedett: {stats['no_match']} ({stats['no_match_rate']:.1%})  |  "
+            f"Kihagyott (már címkézett): {stats['skipped']}\n"
+            f"Kötegek: {stats['batches']}  |  "
+            f"Utolsó köteg: {stats['last_batch_seconds'] * 1000:.1f} ms  |  "
+            f"Leglassabb köteg: {stats['max_batch_seconds'] * 1000:.1f} ms  |  "
+            f"{stats['emails_per_second']:.0f} email/s\n"
+            f"Feladó-gyorsítótár: {memo['senders']} feladó  |  "
+            f"találati arány: {memo['hits'] / lookups if lookups else 0.0:.1%}"
+        )
+
+        self.diag_tree.delete(*self.diag_tree.get_children())
+        for rule in sorted(summary["rules"], key=lambda r: r["priority"]):
+            avg = f"{rule['avg_us']:.1f}" if rule["avg_us"] is not None else "-"
+            self.diag_tree.insert("", tk.END, values=(rule["name"], rule["tag"], rule["priority"],
+                                                      rule["hits"], avg))
+
+    def _reset_diagnostics(self) -> None:
+        RULE_STATS.reset()
+        self._refresh_diagnostics()
+
     def _save_settings(self) -> None:
         """Save settings to INI file"""
         try:
@@ -243,9 +309,12 @@ class SettingsWindow:
             with open(self.settings_path, 'w', encoding='utf-8') as f:
                 self.config.write(f)
 
+            # Új szabályok azonnal: a feliratkozók (lista) újraértékelnek
+            rules_service.reload()
+
             messagebox.showinfo("Siker",
                                "A beállítások sikeresen mentésre kerültek!\n\n"
-                               "Az új szabályok az alkalmazás újraindítása után lépnek érvénybe.")
+                               "Az új szabályok azonnal érvénybe léptek.")
 
             self.window.destroy()
 
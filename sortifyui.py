@@ -1,5 +1,6 @@
 import sys
 import os
+import queue
 
 # Fix tkhtmlview compatibility
 from PIL import Image
@@ -13,6 +14,7 @@ from tkinter import messagebox
 from tkhtmlview import HTMLScrolledText
 
 from models import app_state
+from business import rules_service
 from utils import resource_path, format_date_hungarian, clean_html_for_display
 from utils.config_helper import get_ai_consent
 from services.attachment_cache_service import AttachmentCacheService
@@ -26,38 +28,65 @@ auth_controller = None
 
 detail_widgets = {}
 select_all_var = None
+search_var = None
+search_after_id = None
 
 attachment_cache = AttachmentCacheService()
 
 AI_ICON = "✨"
 
+# Callbacks posted by watcher / worker threads; Tk is not thread-safe, so only the Tk thread runs them
+ui_events = queue.Queue()
+UI_POLL_MS = 100
+
 
 def populate_tree_from_emails(emails):
     treeemails.delete(*treeemails.get_children())
     app_state.all_tree_items.clear()
+    app_state.archived_tree_items.clear()
     app_state.email_data_map.clear()
 
-    emails.sort(key=lambda x: x.get("datetime", ""), reverse=True)
+    emails.sort(key=lambda x: x.datetime, reverse=True)
 
     for idx, e in enumerate(emails):
-        formatted_date = format_date_hungarian(e.get("datetime", "N/A"))
-        ai_indicator = AI_ICON if e.get('ai_summary') else ""
-
-        values = (
-            e.get("sender_name", ""),
-            e.get("subject", "(no subject)"),
-            e.get("tag", "----"),
-            e.get("attachment_count", 0),
-            ai_indicator,
-            formatted_date,
-        )
-
         tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-        item_id = treeemails.insert("", tk.END, values=values, tags=(tag,))
+        item_id = treeemails.insert("", tk.END, values=email_tree_values(e), tags=(tag,))
         app_state.all_tree_items.append(item_id)
         app_state.email_data_map[item_id] = e
 
 
+def email_tree_values(e):
+    return (
+        e.sender_name,
+        e.subject or "(no subject)",
+        e.tag,
+        e.attachment_count,
+        AI_ICON if e.ai_summary else "",
+        format_date_hungarian(e.datetime or "N/A"),
+    )
+
+
+def insert_archived_row(e):
+    """Archív keresési találat hozzáadása a listához (szűrés törlésekor eltűnik)"""
+    item_id = treeemails.insert("", tk.END, values=email_tree_values(e), tags=('archived',))
+    app_state.all_tree_items.append(item_id)
+    app_state.archived_tree_items.append(item_id)
+    app_state.email_data_map[item_id] = e
+    return item_id
+
+
+def remove_archived_rows():
+    if not app_state.archived_tree_items:
+        return
+    archived = set(app_state.archived_tree_items)
+    for item_id in archived:
+        if treeemails.exists(item_id):
+            treeemails.delete(item_id)
+        app_state.email_data_map.pop(item_id, None)
+    app_state.all_tree_items[:] = [i for i in app_state.all_tree_items if i not in archived]
+    app_state.archived_tree_items.clear()
+
+
 def update_tag_counts_from_storage(emails):
     """Frissíti a címke gombok számlálóit a megadott email-lista alapján."""
     if emails is None:
@@ -74,7 +103,7 @@ def update_tag_counts_from_storage(emails):
     }
 
     for e in emails:
-        tag = (e.get('tag') or '').lower()
+        tag = (e.tag or '').lower()
         if tag in counts:
             counts[tag] += 1
 
@@ -139,10 +168,9 @@ def load_offline_emails():
         if emails:
             chkselectall.config(state="normal")
 
-        if app_state.is_test_mode():
-            test_mode_label.config(
-                text="⚠ TESZT MÓD: emails_mod.csv betöltve - frissítés letiltva"
-            )
+        test_mode_label.config(
+            text="⚠ TESZT MÓD: emails_mod.csv betöltve - frissítés letiltva" if app_state.is_test_mode() else ""
+        )
 
         print("DEBUG counts on startup:", app_state.categorized_counts)
 
@@ -280,7 +308,7 @@ def update_details_panel(email_data):
     if attachment_names and isinstance(attachment_names, str):
         import re
         attachments = [a.strip() for a in re.split(r'[;|]', attachment_names) if a.strip()]
-    elif isinstance(attachment_names, list):
+    elif isinstance(attachment_names, (list, tuple)):
         attachments = [str(a).strip() for a in attachment_names if str(a).strip()]
 
     for idx, filename in enumerate(attachments[:3]):
@@ -442,8 +470,11 @@ def ai_label_single_email():
         # CSAK CSV mentés, Gmail címke már meg van!
         # (a auto_label_email már meghívta az apply_label_to_message-t)
         if email_controller:
-            # Save csak CSV-be, NE írjon Gmail-re
-            email_controller.storage.save_emails(app_state.all_emails)
+            # Save csak storage-ba (repository -> journal), NE írjon Gmail-re
+            # AI címke: már nem szabály eredménye, szabályváltozás nem írja felül
+            app_state.repository.update_fields(email_data.get('message_id'), tag=email_data.get('tag', '----'),
+                                               rule_applied="")
+            app_state.repository.flush()
             print(f"[INFO] Tag saved for message_id={email_data.get('message_id')}: {email_data.get('tag')}")
 
         # Címke számok frissítése
@@ -507,7 +538,6 @@ def get_emails(_event):
                 )
 
         if synced_emails:
-            app_state.all_emails = synced_emails
             populate_tree_from_emails(synced_emails)
             update_tag_counts_from_storage(synced_emails)
             update_attachment_button_count(synced_emails)
@@ -556,10 +586,41 @@ def filter_by_attachment():
     btnclearfilters.place(x=851, y=636, width=150, height=30)
 
 
+def on_search_changed(_event=None):
+    """Debounced keresés gépelés közben"""
+    global search_after_id
+    if search_after_id is not None:
+        windowsortify.after_cancel(search_after_id)
+    search_after_id = windowsortify.after(250, run_search)
+
+
+def run_search():
+    global search_after_id
+    search_after_id = None
+    if email_controller is None:
+        return
+
+    query = search_var.get().strip()
+    if not query:
+        if app_state.is_filtered:
+            clear_filters()
+        return
+
+    remove_archived_rows()
+    email_controller.filter_by_search(query, app_state.all_tree_items, treeemails,
+                                      insert_archived=insert_archived_row)
+
+    treeemails.selection_remove(treeemails.get_children())
+    btncategorize.config(state="disabled")
+    btnclearfilters.place(x=851, y=636, width=150, height=30)
+
+
 def clear_filters():
     if email_controller is None:
         return
 
+    search_var.set("")
+    remove_archived_rows()
     email_controller.clear_filters(app_state.all_tree_items, treeemails)
     treeemails.selection_remove(treeemails.get_children())
     btncategorize.config(state="disabled")
@@ -643,6 +704,58 @@ def update_get_emails_button_state():
         btngetmails.config(state="disabled")
 
 
+def on_storage_profile_changed(_profile=None):
+    """Test data set appeared / disappeared at runtime: reload from the new CSV"""
+    clear_filters()
+    update_get_emails_button_state()
+    load_offline_emails()
+
+
+def on_emails_archived(message_ids):
+    """Old emails moved to the archive tier: remove their rows from the list"""
+    removed = {item_id for item_id, e in app_state.email_data_map.items() if e.message_id in message_ids}
+    for item_id in removed:
+        if treeemails.exists(item_id):
+            treeemails.delete(item_id)
+        del app_state.email_data_map[item_id]
+    app_state.all_tree_items[:] = [i for i in app_state.all_tree_items if i not in removed]
+    update_tag_counts_from_storage(app_state.all_emails)
+    update_attachment_button_count(app_state.all_emails)
+
+
+def on_rules_changed(old_rules=None, new_rules=None):
+    """Rules were reloaded: re-evaluate the affected rule-based tags and refresh the changed rows"""
+    if email_controller is None:
+        return
+    changed = {e.message_id for e in email_controller.reapply_rules(old_rules, new_rules)}
+    if not changed:
+        return
+
+    for item_id, e in app_state.email_data_map.items():
+        if e.message_id in changed and treeemails.exists(item_id):
+            treeemails.item(item_id, values=email_tree_values(e))
+    update_tag_counts_from_storage(None)
+
+
+def post_to_ui(func, *args):
+    """Run func(*args) on the Tk thread; safe to call from any thread"""
+    ui_events.put((func, args))
+
+
+def process_ui_events():
+    """Run the callbacks posted by other threads, then poll again"""
+    while True:
+        try:
+            func, args = ui_events.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"[UI] Event handler {getattr(func, '__name__', func)} failed: {e}")
+    windowsortify.after(UI_POLL_MS, process_ui_events)
+
+
 def session_login():
     if auth_controller is None:
         messagebox.showerror("Hiba", "Auth controller not initialized")
@@ -712,7 +825,16 @@ test_mode_label = tk.Label(master=framemain,
                            bg="#EDECEC",
                            fg="#AA0000",
                            anchor="w")
-test_mode_label.place(x=10, y=0, width=800, height=20)
+test_mode_label.place(x=10, y=0, width=560, height=20)
+
+lbl_search = tk.Label(master=framemain, text="🔍", bg="#EDECEC", fg="#333", anchor="e")
+lbl_search.place(x=575, y=0, width=25, height=20)
+
+search_var = tk.StringVar()
+entry_search = ttk.Entry(master=framemain, textvariable=search_var, font=("", 9))
+entry_search.bind("<KeyRelease>", on_search_changed)
+entry_search.bind("<Return>", lambda _e: run_search())
+entry_search.place(x=600, y=0, width=400, height=20)
 
 style.configure("btngetmails.TButton", background="#E4E2E2", foreground="#000")
 style.map("btngetmails.TButton", background=[("active", "#E4E2E2")],
@@ -844,6 +966,7 @@ treeemails.place(x=9, y=20, width=991, height=606)
 
 treeemails.tag_configure('oddrow', background='#FFFFFF')
 treeemails.tag_configure('evenrow', background='#F5F5F5')
+treeemails.tag_configure('archived', foreground='#888888')
 
 attach_header = "📎"
 try:
@@ -992,5 +1115,18 @@ def initialize_ui():
     check_initial_login_state()
     load_offline_emails()
 
+    process_ui_events()
+
+    # Old emails move to the archive tier in the background, after the list is shown
+    email_controller.archive_in_background(post_to_ui, on_emails_archived)
+
+    # Storage profile switches come from the watcher thread - handle them on the Tk thread
+    if app_state.email_storage is not None:
+        app_state.email_storage.profile_listeners.append(
+            lambda profile: post_to_ui(on_storage_profile_changed, profile))
+
+    # Rule set swaps (hot reload) likewise arrive from the watcher thread
+    rules_service.subscribe(lambda old, new: post_to_ui(on_rules_changed, old, new))
+
     if not get_ai_consent():
         windowsortify.after(500, lambda: show_ai_consent_dialog(windowsortify))
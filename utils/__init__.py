@@ -3,11 +3,18 @@ Utility functions for Sortify
 """
 from .resource_utils import resource_path
 from .date_utils import format_date_hungarian
-from .html_utils import clean_html_for_display, strip_html_tags
+from .html_utils import clean_html_for_display, strip_html_tags, html_to_text, email_body_text
+from .sender_utils import SenderInfo, apply_sender_info, normalize_sender, registrable_domain
 
 __all__ = [
     'resource_path',
     'format_date_hungarian',
     'clean_html_for_display',
     'strip_html_tags',
+    'html_to_text',
+    'email_body_text',
+    'SenderInfo',
+    'apply_sender_info',
+    'normalize_sender',
+    'registrable_domain',
 ]
@@ -1,8 +1,11 @@
 """
 Date formatting utilities
 """
+import re
 from datetime import datetime
 
+_STORAGE_FORMAT_RE = re.compile(r"^\d{4}\.\d{2}\.\d{2} \d{2}:\d{2}$")
+
 
 def format_date_hungarian(date_str: str) -> str:
     """Format date to Hungarian format with smart today/time display
@@ -15,6 +18,12 @@ def format_date_hungarian(date_str: str) -> str:
     """
     if not date_str or date_str == "N/A":
         return "N/A"
+
+    # Fast path: storage format 'YYYY.MM.DD HH:MM' needs no parsing
+    if _STORAGE_FORMAT_RE.match(date_str):
+        if date_str[:10] == datetime.now().strftime("%Y.%m.%d"):
+            return date_str[11:]
+        return date_str
     
     try:
         # Try parsing RFC 2822 format (from Gmail API)
@@ -2,6 +2,7 @@
 HTML cleaning utilities for tkhtmlview compatibility
 """
 import re
+from html.parser import HTMLParser
 
 
 def clean_html_for_display(html_content: str) -> str:
@@ -43,3 +44,89 @@ def strip_html_tags(html_content: str) -> str:
         str: Plain text without HTML tags
     """
     return re.sub(r'<[^>]+>', '', html_content)
+
+
+class HtmlTextExtractor(HTMLParser):
+    """Streaming HTML -> plain text converter
+
+    Feed HTML in any number of chunks; <style>, <script>, <head> content is dropped,
+    entities are decoded, block elements become line breaks.
+    """
+
+    _SKIP = frozenset(("style", "script", "head", "title", "noscript", "template"))
+    _BLOCK = frozenset((
+        "p", "div", "section", "article", "header", "footer", "table", "tr", "ul", "ol",
+        "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "hr", "form",
+    ))
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skip_depth += 1
+        elif tag == "br":
+            self._parts.append("\n")
+        elif tag == "li":
+            self._parts.append("\n- ")
+        elif tag in ("td", "th"):
+            self._parts.append(" ")
+        elif tag in self._BLOCK:
+            self._parts.append("\n\n")
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "br":
+            self._parts.append("\n")
+        elif tag == "hr":
+            self._parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self._BLOCK:
+            self._parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def get_text(self) -> str:
+        """Return the collected text with normalized whitespace"""
+        self.close()
+        text = "".join(self._parts).replace("\xa0", " ")
+        text = re.sub(r"[ \t\r\f\v]+", " ", text)
+        text = re.sub(r" *\n *", "\n", text)
+        text = re.sub(r"\n{3,}", "\n\n", text)  # Max 2 consecutive newlines
+        return text.strip()
+
+
+def html_to_text(html_content: str) -> str:
+    """Convert HTML to readable plain text (drops style/script, decodes entities)
+
+    Args:
+        html_content: HTML string
+
+    Returns:
+        str: Plain text
+    """
+    if not html_content:
+        return ""
+    parser = HtmlTextExtractor()
+    parser.feed(html_content)
+    return parser.get_text()
+
+
+def email_body_text(email) -> str:
+    """Plain-text body of an email record / dict
+
+    Uses the text extracted at ingest ('body_text'); only dicts without it
+    (e.g. fresh Gmail details) are converted on the fly.
+    """
+    if "body_text" in email:
+        return email.get("body_text") or ""
+    body_plain = email.get("body_plain") or ""
+    if body_plain.strip():
+        return body_plain
+    return html_to_text(email.get("body_html") or "")
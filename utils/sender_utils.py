@@ -0,0 +1,55 @@
+"""
+Sender header normalization
+One parser for the 'From' header, used at ingest (fields persisted with the email)
+and as fallback for records stored before those fields existed.
+"""
+from email.utils import parseaddr
+from functools import lru_cache
+from typing import NamedTuple
+
+# Public suffixes with two labels that occur in the mailbox (registrable domain = 3 labels)
+MULTI_LABEL_SUFFIXES = frozenset((
+    "co.uk", "ac.uk", "gov.uk", "org.uk", "co.hu", "org.hu", "info.hu", "gov.hu",
+    "com.au", "edu.au", "co.at", "ac.at", "com.br", "co.jp", "co.nz", "com.tr",
+    "co.za", "com.cn", "edu.pl", "com.pl",
+))
+
+
+class SenderInfo(NamedTuple):
+    address: str        # lowercased address ('' if the header has none)
+    domain: str         # lowercased part after '@'
+    reg_domain: str     # registrable domain, e.g. neptun.uni-milton.hu -> uni-milton.hu
+    display_name: str   # display name, or the address if there is none
+
+
+def registrable_domain(domain: str) -> str:
+    """Last two labels of a domain (three for known two-label suffixes such as co.uk)"""
+    labels = domain.strip(".").split(".")
+    if len(labels) <= 2:
+        return domain
+    keep = 3 if ".".join(labels[-2:]) in MULTI_LABEL_SUFFIXES else 2
+    return ".".join(labels[-keep:])
+
+
+@lru_cache(maxsize=65536)
+def normalize_sender(raw: str) -> SenderInfo:
+    """Parse a raw 'From' header ('Name <user@domain>' or a bare address)
+
+    Memoized by the raw header string: a mailbox has far fewer distinct
+    senders than emails.
+    """
+    name, addr = parseaddr(raw or "")
+    address = (addr or raw or "").strip().lower()
+    domain = address.rsplit("@", 1)[1] if "@" in address else ""
+    return SenderInfo(address, domain, registrable_domain(domain) if domain else "",
+                      name.strip() or addr.strip())
+
+
+def apply_sender_info(email) -> SenderInfo:
+    """Set sender_address / sender_domain / sender_reg_domain / sender_name of an email from its 'sender'"""
+    info = normalize_sender(email.get("sender", ""))
+    email["sender_address"] = info.address
+    email["sender_domain"] = info.domain
+    email["sender_reg_domain"] = info.reg_domain
+    email["sender_name"] = info.display_name
+    return info